@@ -0,0 +1,129 @@
+"""
+Thin FFT layer so the PSF/OTF code can run on multithreaded backends.
+
+Backends, in order of preference: pyFFTW (cached plans on aligned buffers),
+scipy.fft (with workers=N) and numpy (single threaded). Missing backends fall
+back to numpy.
+"""
+
+import os
+import numpy as np
+
+try:
+    import scipy.fft as _scipy_fft
+except ImportError:
+    _scipy_fft = None
+
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
+
+BACKENDS = ('pyfftw', 'scipy', 'numpy')
+
+_backend = 'numpy'
+_workers = 1
+_planner_effort = 'FFTW_MEASURE'
+_plans = {}
+
+fftshift = np.fft.fftshift
+ifftshift = np.fft.ifftshift
+
+def available_backends():
+    """ Return the names of the backends that can be imported here. """
+    have = {'pyfftw': pyfftw is not None, 'scipy': _scipy_fft is not None, 'numpy': True}
+    return [b for b in BACKENDS if have[b]]
+
+def set_backend(name=None, workers=None, planner_effort='FFTW_MEASURE'):
+    """
+    Choose the FFT backend used by fft/ifft and fft2/ifft2.
+
+    Parameters
+    ----------
+    name : str
+        One of 'pyfftw', 'scipy' or 'numpy'. None picks the fastest
+        available. An unavailable backend falls back to numpy.
+    workers : int
+        Number of threads for scipy/pyFFTW. None uses all cores.
+    planner_effort : str
+        FFTW planner flag used when building pyFFTW plans.
+
+    Returns
+    -------
+    name : str
+        The backend actually in use.
+    """
+    global _backend, _workers, _planner_effort
+
+    available = available_backends()
+    if name is None:
+        name = available[0]
+    elif name not in BACKENDS:
+        raise ValueError(f"Unknown FFT backend '{name}', expected one of {BACKENDS}")
+    elif name not in available:
+        name = 'numpy'
+
+    _backend = name
+    _workers = os.cpu_count() if workers is None else int(workers)
+    _planner_effort = planner_effort
+    _plans.clear()
+
+    return _backend
+
+def get_backend():
+    """ Return (backend name, number of workers). """
+    return _backend, _workers
+
+def _fftw_plan(a, axes, direction):
+    key = (direction, a.shape, a.dtype.str, axes)
+    plan = _plans.get(key)
+    if plan is None:
+        inp = pyfftw.empty_aligned(a.shape, dtype=a.dtype)
+        out = pyfftw.empty_aligned(a.shape, dtype=a.dtype)
+        plan = pyfftw.FFTW(inp, out, axes=axes, direction=direction,
+                           threads=_workers, flags=(_planner_effort,))
+        _plans[key] = plan
+    return plan
+
+def _fftw(a, axes, direction):
+    a = np.asarray(a)
+    if not np.iscomplexobj(a):
+        a = a.astype(np.result_type(a.dtype, np.complex64))
+    axes = tuple(ax % a.ndim for ax in axes)
+    plan = _fftw_plan(a, axes, direction)
+    # The plan's output buffer is reused on the next call
+    return plan(a).copy()
+
+def fft(a, axis=-1):
+    """ 1D forward FFT along axis, through the active backend. """
+    if _backend == 'pyfftw':
+        return _fftw(a, (axis,), 'FFTW_FORWARD')
+    if _backend == 'scipy':
+        return _scipy_fft.fft(a, axis=axis, workers=_workers)
+    return np.fft.fft(a, axis=axis)
+
+def ifft(a, axis=-1):
+    """ 1D inverse FFT along axis, through the active backend. """
+    if _backend == 'pyfftw':
+        return _fftw(a, (axis,), 'FFTW_BACKWARD')
+    if _backend == 'scipy':
+        return _scipy_fft.ifft(a, axis=axis, workers=_workers)
+    return np.fft.ifft(a, axis=axis)
+
+def fft2(a, axes=(-2,-1)):
+    """ 2D forward FFT over axes, through the active backend. """
+    if _backend == 'pyfftw':
+        return _fftw(a, axes, 'FFTW_FORWARD')
+    if _backend == 'scipy':
+        return _scipy_fft.fft2(a, axes=axes, workers=_workers)
+    return np.fft.fft2(a, axes=axes)
+
+def ifft2(a, axes=(-2,-1)):
+    """ 2D inverse FFT over axes, through the active backend. """
+    if _backend == 'pyfftw':
+        return _fftw(a, axes, 'FFTW_BACKWARD')
+    if _backend == 'scipy':
+        return _scipy_fft.ifft2(a, axes=axes, workers=_workers)
+    return np.fft.ifft2(a, axes=axes)
+
+set_backend()
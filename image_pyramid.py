@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Multi-resolution pyramid and tiled viewport for very large images.
+
+Downsampled levels are built on first use, band by band so that memmapped
+sources are never read whole, and can themselves be memmapped .npy files.
+The viewport only fetches the tiles of the level matching the current zoom
+that intersect the view, converts them to uint8 once and keeps them in an
+LRU cache, so panning and zooming cost the same at any image size.
+
+Usage:
+    python image_pyramid.py image.npy [--cache-dir .pyramid]
+"""
+
+import os
+import sys
+import hashlib
+import argparse
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+def image_key(image, n_rows=16):
+    """
+    sha1 identifying image, cheap enough to compute on every open.
+
+    Hashes the shape, dtype and n_rows evenly spaced rows of image and, for
+    memmaps, the path, size and modification time of their file, so the
+    image is never read whole. Edits that keep the file size and time and
+    miss the sampled rows go unnoticed.
+    """
+    h = hashlib.sha1(repr((image.shape, np.dtype(image.dtype).str)).encode())
+    filename = getattr(image, 'filename', None)
+    if filename is not None:
+        st = os.stat(filename)
+        h.update(repr((os.path.abspath(filename), st.st_size, st.st_mtime_ns,
+                       image.offset, image.strides)).encode())
+    if image.shape[0]:
+        for r in np.unique(np.linspace(0, image.shape[0]-1, n_rows).astype(np.intp)):
+            h.update(np.ascontiguousarray(image[r]).data)
+    return h.hexdigest()
+
+def downsample2(src, out=None, band_rows=1024):
+    """
+    2x2 mean of src (H, W[, C]) into out (H//2, W//2[, C]), band_rows source
+    rows at a time. Odd trailing rows/columns are dropped.
+    """
+    h, w = src.shape[0]//2, src.shape[1]//2
+    if out is None:
+        out = np.empty((h, w) + src.shape[2:], dtype=src.dtype)
+    band_rows -= band_rows % 2
+    for r in range(0, 2*h, band_rows):
+        block = np.asarray(src[r:min(r+band_rows, 2*h), :2*w], dtype=np.float32)
+        acc = block[0::2, 0::2] + block[1::2, 0::2]
+        acc += block[0::2, 1::2]
+        acc += block[1::2, 1::2]
+        acc *= 0.25
+        if out.dtype.kind in 'iu':
+            np.rint(acc, out=acc)
+        out[r//2:r//2+acc.shape[0]] = acc
+    return out
+
+class ImagePyramid:
+    """
+    Lazily built 2x mean pyramid of a 2D (H, W) or RGB (H, W, 3) image.
+
+    Parameters
+    ----------
+    image : np.array
+        Full resolution image (level 0), e.g. a np.load(..., mmap_mode='r')
+        memmap.
+    tile_size : int
+        Edge length of the square tiles served by tile().
+    cache_dir : str
+        If given, levels are written there as .npy memmaps, else kept in
+        memory. Files are keyed on the image (see image_key) and only
+        appear once complete, so later instances reuse them for the same
+        image only.
+    name : str
+        File name prefix of the levels in cache_dir.
+    """
+    def __init__(self, image, tile_size=256, cache_dir=None, name='level'):
+        self.tile_size = tile_size
+        self.cache_dir = cache_dir
+        self.name = name
+        self.key = None
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.key = image_key(image)[:16]
+
+        self._levels = [image]
+        n, (h, w) = 1, image.shape[:2]
+        while max(h, w) > tile_size:
+            h, w, n = h//2, w//2, n+1
+        self.n_levels = n
+
+    @property
+    def shape(self):
+        return self._levels[0].shape
+
+    def _path(self, k):
+        return os.path.join(self.cache_dir, f"{self.name}_{self.key}_{k}.npy")
+
+    def level(self, k):
+        """ Level k (2^k downsampled), built from level k-1 on first use. """
+        if not 0 <= k < self.n_levels:
+            raise IndexError(f"Pyramid level {k} out of range(0, {self.n_levels})")
+        while len(self._levels) <= k:
+            prev = self._levels[-1]
+            shape = (prev.shape[0]//2, prev.shape[1]//2) + prev.shape[2:]
+            if self.cache_dir is None:
+                self._levels.append(downsample2(prev))
+                continue
+
+            path = self._path(len(self._levels))
+            if not os.path.exists(path):
+                # build under a temporary name and rename once complete, so an
+                # interrupted build never leaves a partial level behind
+                fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.npy.tmp')
+                os.close(fd)
+                try:
+                    out = np.lib.format.open_memmap(tmp, mode='w+', dtype=prev.dtype, shape=shape)
+                    downsample2(prev, out)
+                    out.flush()
+                    del out
+                    os.replace(tmp, path)
+                except BaseException:
+                    os.remove(tmp)
+                    raise
+            self._levels.append(np.load(path, mmap_mode='r'))
+        return self._levels[k]
+
+    def n_tiles(self, k):
+        """ (rows, columns) of tiles of level k. """
+        h, w = self.level(k).shape[:2]
+        t = self.tile_size
+        return -(-h//t), -(-w//t)
+
+    def tile(self, k, ty, tx):
+        """ Tile (ty, tx) of level k, smaller than tile_size at the right/bottom edges. """
+        t = self.tile_size
+        return self.level(k)[ty*t:(ty+1)*t, tx*t:(tx+1)*t]
+
+    def bounds(self, percentiles=(0, 100)):
+        """ Display (lo, hi) estimated from the coarsest level. """
+        lo, hi = np.percentile(np.asarray(self.level(self.n_levels-1), dtype=np.float32), percentiles)
+        return float(lo), float(hi)
+
+class TileCache:
+    """
+    LRU of display-ready uint8 tiles keyed on (level, ty, tx) and the display
+    bounds.
+    """
+    def __init__(self, pyramid, lo, hi, max_tiles=256):
+        self.pyramid = pyramid
+        self.max_tiles = max_tiles
+        self.set_bounds(lo, hi)
+        self._tiles = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._tiles)
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'tiles': len(self)}
+
+    def set_bounds(self, lo, hi):
+        self.lo, self.hi = lo, hi
+        self._scale = np.float32(255/(hi-lo)) if hi > lo else np.float32(0)
+
+    def get(self, k, ty, tx):
+        key = (k, ty, tx, self.lo, self.hi)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            self.hits += 1
+            return tile
+
+        self.misses += 1
+        f = np.subtract(self.pyramid.tile(k, ty, tx), self.lo, dtype=np.float32)
+        f *= self._scale
+        np.clip(f, 0, 255, out=f)
+        tile = f.astype(np.uint8)
+        self._tiles[key] = tile
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+        return tile
+
+    def clear(self):
+        self._tiles.clear()
+
+class TiledViewport:
+    """
+    Screen-sized view of a pyramid at a given center and zoom.
+
+    Parameters
+    ----------
+    pyramid : ImagePyramid
+    width, height : int
+        Viewport size in screen pixels.
+    lo, hi : float
+        Display bounds, default pyramid.bounds().
+    max_tiles : int
+        Size of the tile LRU.
+    """
+    def __init__(self, pyramid, width=800, height=800, lo=None, hi=None, max_tiles=256):
+        self.pyramid = pyramid
+        self.width, self.height = width, height
+        if lo is None or hi is None:
+            lo, hi = pyramid.bounds()
+        self.cache = TileCache(pyramid, lo, hi, max_tiles)
+        self.buffer = np.zeros((height, width) + pyramid.shape[2:], dtype=np.uint8)
+        self.fit()
+
+    def fit(self):
+        """ Center the image and zoom so it fits the viewport. """
+        h, w = self.pyramid.shape[:2]
+        self.cy, self.cx = h/2, w/2
+        self.zoom = min(self.height/h, self.width/w)
+
+    def pan(self, dx, dy):
+        """ Move the view by (dx, dy) screen pixels. """
+        self.cx -= dx/self.zoom
+        self.cy -= dy/self.zoom
+
+    def zoom_at(self, factor, sx=None, sy=None):
+        """ Zoom by factor keeping the image point under screen (sx, sy) fixed. """
+        sx = self.width/2 if sx is None else sx
+        sy = self.height/2 if sy is None else sy
+        px, py = self.cx + (sx-self.width/2)/self.zoom, self.cy + (sy-self.height/2)/self.zoom
+        self.zoom *= factor
+        self.cx, self.cy = px - (sx-self.width/2)/self.zoom, py - (sy-self.height/2)/self.zoom
+
+    def current_level(self):
+        # coarsest level with at least one level pixel per screen pixel
+        k = int(np.floor(np.log2(1/self.zoom))) if self.zoom < 1 else 0
+        return min(max(k, 0), self.pyramid.n_levels-1)
+
+    def visible_tiles(self):
+        """ (level, [(ty, tx), ...]) of the tiles intersecting the view. """
+        k = self.current_level()
+        d = 2**k
+        t = self.pyramid.tile_size
+        x0 = (self.cx - self.width/2/self.zoom)/d
+        y0 = (self.cy - self.height/2/self.zoom)/d
+        x1 = (self.cx + self.width/2/self.zoom)/d
+        y1 = (self.cy + self.height/2/self.zoom)/d
+        rows, cols = self.pyramid.n_tiles(k)
+        ty = range(max(int(y0//t), 0), min(int(y1//t)+1, rows))
+        tx = range(max(int(x0//t), 0), min(int(x1//t)+1, cols))
+        return k, [(i, j) for i in ty for j in tx]
+
+    def render(self):
+        """ Draw the visible tiles (nearest neighbour) into self.buffer and return it. """
+        self.buffer[...] = 0
+        k, tiles = self.visible_tiles()
+        d = 2**k
+        t = self.pyramid.tile_size
+
+        # level coordinates of every screen row/column
+        ly = (self.cy + (np.arange(self.height)+0.5-self.height/2)/self.zoom)/d
+        lx = (self.cx + (np.arange(self.width)+0.5-self.width/2)/self.zoom)/d
+        iy, ix = np.floor(ly).astype(np.intp), np.floor(lx).astype(np.intp)
+
+        for ty, tx in tiles:
+            tile = self.cache.get(k, ty, tx)
+            rows = np.nonzero((iy >= ty*t) & (iy < ty*t+tile.shape[0]))[0]
+            cols = np.nonzero((ix >= tx*t) & (ix < tx*t+tile.shape[1]))[0]
+            if rows.size and cols.size:
+                self.buffer[rows[0]:rows[-1]+1, cols[0]:cols[-1]+1] = \
+                    tile[iy[rows]-ty*t][:, ix[cols]-tx*t]
+        return self.buffer
+
+class PyramidViewer:
+    """
+    Tk window showing a TiledViewport in a PhotoImage: drag to pan, mouse
+    wheel to zoom, 'f' to fit.
+    """
+    def __init__(self, viewport, root=None):
+        import tkinter as tk
+        from PIL import Image, ImageTk
+        self.Image = Image
+
+        self.viewport = viewport
+        self.root = tk.Tk() if root is None else root
+        self.img = ImageTk.PhotoImage(Image.fromarray(viewport.render()))
+        self.lbl = tk.Label(self.root, image=self.img, borderwidth=0)
+        self.lbl.pack()
+
+        self._drag = None
+        self._pending = False
+        self.lbl.bind('<ButtonPress-1>', self._press)
+        self.lbl.bind('<B1-Motion>', self._motion)
+        self.lbl.bind('<MouseWheel>', self._wheel)
+        self.lbl.bind('<Button-4>', lambda e: self._zoom(e, 1.25))
+        self.lbl.bind('<Button-5>', lambda e: self._zoom(e, 0.8))
+        self.root.bind('f', lambda e: (self.viewport.fit(), self.redraw()))
+
+    def redraw(self):
+        # coalesce bursts of input events into one render per idle
+        if not self._pending:
+            self._pending = True
+            self.root.after_idle(self._draw)
+
+    def _draw(self):
+        self._pending = False
+        self.img.paste(self.Image.fromarray(self.viewport.render()))
+
+    def _press(self, e):
+        self._drag = (e.x, e.y)
+
+    def _motion(self, e):
+        self.viewport.pan(e.x-self._drag[0], e.y-self._drag[1])
+        self._drag = (e.x, e.y)
+        self.redraw()
+
+    def _wheel(self, e):
+        self._zoom(e, 1.25 if e.delta > 0 else 0.8)
+
+    def _zoom(self, e, factor):
+        self.viewport.zoom_at(factor, e.x, e.y)
+        self.redraw()
+
+    def run(self):
+        self.root.mainloop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image', help=".npy image, memory mapped")
+    parser.add_argument('--cache-dir', help="Keep the pyramid levels as .npy files here")
+    parser.add_argument('--tile-size', type=int, default=256)
+    parser.add_argument('--size', type=int, nargs=2, default=(800, 800), metavar=('W', 'H'))
+    args = parser.parse_args(argv)
+
+    name = os.path.splitext(os.path.basename(args.image))[0]
+    pyramid = ImagePyramid(np.load(args.image, mmap_mode='r'), args.tile_size, args.cache_dir, name)
+    PyramidViewer(TiledViewport(pyramid, *args.size)).run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
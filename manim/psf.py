@@ -1,40 +1,243 @@
+from functools import lru_cache
+
 import numpy as np
 
-def colorize(arr, c=None):
+from splat import splat
+
+def _asarray(x, dtype=None):
+    # dtype=None keeps numpy's default (float64) promotion
+    return np.asarray(x) if dtype is None else np.asarray(x, dtype=dtype)
+
+def _cast(arr, dtype=None):
+    return arr if dtype is None else arr.astype(dtype, copy=False)
+
+def _out(out, x, y, dtype=None):
+    # 2D kernels write into out if given, else a new (len(x), len(y)) array
+    if out is None:
+        out = np.empty((x.size, y.size), dtype=np.result_type(x, y, 1.0) if dtype is None else dtype)
+    return out
+
+def _affine(arr, a=1, b=0):
+    # arr = a*(arr + b), in place
+    if np.any(b != 0):
+        arr += b
+    if np.any(a != 1):
+        arr *= a
+    return arr
+
+@lru_cache(maxsize=64)
+def _lut(rgb):
+    # 256-entry uint8 color ramp from black to rgb
+    return (np.arange(256)[:,None]*np.asarray(rgb)[None,:]).astype(np.uint8)
+
+def to_rgb(c):
+    # manim colors expose to_rgb(), plain (r, g, b) tuples are used as-is
+    return tuple(float(v) for v in (c.to_rgb() if hasattr(c, 'to_rgb') else c))
+
+def _quantize(arr):
+    # arr in [0, 1] -> uint8 LUT index (out of range values are clipped)
+    q = np.multiply(arr, 255, dtype=np.float32)
+    np.clip(q, 0, 255, out=q)
+    return q.astype(np.uint8)
+
+def colorize(arr, c=None, out=None):
     if c is None:
-        newarr = (255*arr).astype(np.uint8)
+        newarr = _quantize(arr)
+        if out is not None:
+            out[...] = newarr
+            newarr = out
     else:
         # arr = (arr-arr.min())/(arr.max()-arr.min())
-        newarr = (255*arr[...,None]*c.to_rgb()[None,...]).astype(np.uint8)
+        newarr = composite([arr], [c], out=out)
 
     return newarr
 
-def gauss1D(x, a=1, mu=0, sig=1, b=0):
+def composite(arrs, colors, mode='max', out=None, alpha=False):
+    """
+    Colorize and blend several [0, 1] intensity arrays into one uint8 image.
+
+    Each array is quantized once and looked up in a cached 256-entry LUT per
+    color, then combined into out in place.
+
+    Parameters
+    ----------
+    arrs : list of np.array
+        (H, W) intensities in [0, 1].
+    colors : list
+        One color per array, a manim color (anything with to_rgb()) or an
+        (r, g, b) tuple in [0, 1].
+    mode : str
+        'max' keeps the brightest channel, 'add' sums them with saturation.
+    out : np.array
+        Optional (H, W, 3) or (H, W, 4) uint8 buffer to reuse.
+    alpha : bool
+        Return RGBA (opaque) instead of RGB when out is not given.
+    """
+    if mode not in ('max', 'add'):
+        raise ValueError(f"Unknown composite mode '{mode}', expected 'max' or 'add'")
+
+    shape = np.shape(arrs[0])
+    if out is None:
+        out = np.empty(shape + (4 if alpha else 3,), dtype=np.uint8)
+    rgb = out[...,:3]
+    if out.shape[-1] == 4:
+        out[...,3] = 255
+
+    layer, acc = None, None
+    for i, (arr, c) in enumerate(zip(arrs, colors)):
+        lut = _lut(to_rgb(c))
+        idx = _quantize(arr)
+        if i == 0:
+            np.take(lut, idx, axis=0, out=rgb, mode='clip')
+            continue
+
+        if layer is None:
+            layer = np.empty(shape + (3,), dtype=np.uint8)
+        np.take(lut, idx, axis=0, out=layer, mode='clip')
+        if mode == 'max':
+            np.maximum(rgb, layer, out=rgb)
+        else:
+            # saturating add
+            if acc is None:
+                acc = rgb.astype(np.uint16)
+            acc += layer
+    if acc is not None:
+        np.minimum(acc, 255, out=acc)
+        rgb[...] = acc
+
+    return out
+
+def gauss1D(x, a=1, mu=0, sig=1, b=0, dtype=None):
+    x = _asarray(x, dtype)
     g = a*(np.exp(-((x-mu)**2)/(2*(sig**2))) + b)
 
-    return g
+    return _cast(g, dtype)
 
-def gauss2D(x, y, a=1, mu=[0,0], sig=1, b=0):
-    g = a*(np.exp(-((x[:,None]-mu[0])**2+(y[None,:]-mu[1])**2)/(2*(sig**2))) + b)
+def gauss2D(x, y, a=1, mu=[0,0], sig=1, b=0, dtype=None, out=None):
+    x, y = _asarray(x, dtype), _asarray(y, dtype)
+    # exp(-(dx^2+dy^2)/(2 sig^2)) factors into an outer product of 1D Gaussians
+    gx = np.exp(-((x-mu[0])**2)/(2*(sig**2)))
+    gy = np.exp(-((y-mu[1])**2)/(2*(sig**2)))
+    g = np.multiply.outer(gx, gy, out=_out(out, x, y, dtype))
 
-    return g
+    return _affine(g, a, b)
 
-def donut1D(x, a=1, mu=0, sig=1, b=0):
+def donut1D(x, a=1, mu=0, sig=1, b=0, dtype=None):
+    x = _asarray(x, dtype)
     q = ((x-mu)**2)/(2*(sig**2))
-    d = a*(np.exp(1)*q*np.exp(-q) + b)
+    d = a*(np.e*q*np.exp(-q) + b)
+
+    return _cast(d, dtype)
 
-    return d
-    
-def donut2D(x, y, a=1, mu=[0,0], sig=1, b=0, sigp=None):
-    q = ((x[:,None]-mu[0])**2+(y[None,:]-mu[1])**2)/(2*(sig**2))
+def donut2D(x, y, a=1, mu=[0,0], sig=1, b=0, sigp=None, dtype=None, out=None):
+    x, y = _asarray(x, dtype), _asarray(y, dtype)
+    # e*q*exp(-q) with q = qx + qy: build the radial q once, then scale it
+    # by the separable exp(-qx) exp(-qy), all in place
+    qx = ((x-mu[0])**2)/(2*(sig**2))
+    qy = ((y-mu[1])**2)/(2*(sig**2))
+    d = np.add.outer(qx, qy, out=_out(out, x, y, dtype))
+    d *= np.exp(-qx)[:,None]
+    d *= np.exp(-qy)[None,:]
     if sigp is not None:
-        # Strange case for saturating the middle of the donut
-        qp = ((x[:,None]-mu[0])**2+(y[None,:]-mu[1])**2)/(2*(sigp**2))
-        d = a*(np.exp(1)*qp*np.exp(-q) + b)
+        # Strange case for saturating the middle of the donut, qp = q*(sig/sigp)^2
+        d *= (sig/sigp)**2
+    d *= np.e
+
+    return _affine(d, a, b)
+
+def lorentzian1D(x, a=1, mu=0, gamma=1, b=0, dtype=None):
+    x = _asarray(x, dtype)
+    return _cast(a/(2*np.pi)*gamma/((x-mu)**2+(gamma/2)**2), dtype)
+
+def render_emitters(x, y, mu, sig=1, a=1, kind='gauss', frames=None, n_frames=None,
+                    n_sigma=4, dtype=None, out=None, chunk_size=4096):
+    """
+    Render many Gaussian or donut emitters into one frame or a stack of frames.
+
+    Each emitter is only evaluated in a +/- n_sigma*sig window around its
+    position and its footprint is scatter-added into the output.
+
+    Parameters
+    ----------
+    x, y : np.array
+        Increasing 1D pixel coordinates of the first and second image axes.
+    mu : np.array
+        (K, 2) emitter positions.
+    sig, a : float or np.array
+        Width and amplitude, scalar or one per emitter.
+    kind : str
+        'gauss' (as gauss2D) or 'donut' (as donut2D).
+    frames : np.array
+        Optional (K,) frame index of each emitter. Renders a
+        (n_frames, len(x), len(y)) stack instead of a single frame,
+        ValueError for indices outside of it.
+    n_frames : int
+        Number of frames in the stack. Defaults to max(frames)+1.
+    n_sigma : float
+        Half width of the evaluation window in units of sig.
+    out : np.array
+        Optional buffer to accumulate into (it is not zeroed first). Views
+        that are not C-contiguous are accumulated through a temporary.
+    chunk_size : int
+        Number of emitters evaluated per batch, bounds temporary memory.
+    """
+    x, y = _asarray(x, dtype), _asarray(y, dtype)
+    mu = np.atleast_2d(np.asarray(mu, dtype=float))
+
+    if frames is None:
+        shape = (x.size, y.size)
     else:
-        d = a*(np.exp(1)*q*np.exp(-q) + b)
+        frames = np.asarray(frames, dtype=np.intp)
+        if n_frames is None:
+            n_frames = int(frames.max(initial=-1)) + 1
+        shape = (n_frames, x.size, y.size)
+
+    if out is None:
+        out = np.zeros(shape, dtype=np.result_type(x, y, 1.0) if dtype is None else dtype)
+    if out.shape != shape:
+        raise ValueError(f"out has shape {out.shape}, expected {shape}")
+
+    return splat(out, x, y, mu[:,0], mu[:,1], sig, a, frames, kind, n_sigma, chunk_size)
+
+def sted_survival(I_sted, saturation):
+    """
+    Fraction of fluorophores left undepleted, exp(-ln2 * I_sted/I_sat).
+
+    I_sted is the STED intensity in units of its peak and saturation the
+    peak-to-I_sat ratio. saturation may be an array, in which case the
+    result has shape saturation.shape + I_sted.shape (one exp call).
+    """
+    I_sted = np.asarray(I_sted)
+    zeta = np.asarray(saturation, dtype=I_sted.dtype if I_sted.dtype.kind == 'f' else float)
+    arg = zeta.reshape(zeta.shape + (1,)*I_sted.ndim)*I_sted
+    arg *= -np.log(2)
+    return np.exp(arg, out=arg)
+
+def sted_sigma(sig, saturation):
+    """
+    Width of the effective STED PSF of a sig-wide excitation, as sted2D.
+
+    Near its center the donut2D depletion beam (peak 1) grows as
+    e*r^2/(2 sig^2), so the survival is a Gaussian too and the product is
+    the usual sig/sqrt(1 + ln2*zeta) with zeta = e*saturation.
+    """
+    return sig/np.sqrt(1 + np.e*np.log(2)*np.asarray(saturation, dtype=float))
+
+def sted1D(x, saturation, a=1, mu=0, sig=1, sig_sted=None, b=0, dtype=None):
+    """ 1D effective STED PSF, gauss1D excitation times sted_survival of a donut1D. """
+    exc = gauss1D(x, a=a, mu=mu, sig=sig, dtype=dtype)
+    I_sted = donut1D(x, mu=mu, sig=sig if sig_sted is None else sig_sted, b=b, dtype=dtype)
+    return exc*sted_survival(I_sted, saturation)
 
-    return d
+def sted2D(x, y, saturation, a=1, mu=[0,0], sig=1, sig_sted=None, b=0, dtype=None):
+    """
+    Effective STED PSF, excitation*exp(-ln2 * I_sted/I_sat).
 
-def lorentzian1D(x, a=1, mu=0, gamma=1, b=0):
-    return a/(2*np.pi)*gamma/((x-mu)**2+(gamma/2)**2)
\ No newline at end of file
+    The excitation is gauss2D(sig) and the depletion beam donut2D(sig_sted,
+    b), with b the residual intensity at the donut center. saturation is the
+    donut peak over I_sat, scalar or an array of values, which gives a
+    (len(saturation), len(x), len(y)) sweep from a single batched exp.
+    """
+    exc = gauss2D(x, y, a=a, mu=mu, sig=sig, dtype=dtype)
+    I_sted = donut2D(x, y, mu=mu, sig=sig if sig_sted is None else sig_sted, b=b, dtype=dtype)
+    return exc*sted_survival(I_sted, saturation)
@@ -1,7 +1,7 @@
 import manim as mn
-import numpy as np
 
-from psf import gauss1D, gauss2D, donut2D, colorize
+from psf import gauss1D
+from sprites import psf_sprite, sted_sprite
 
 mn.config.media_width = "75%"
 mn.config.verbosity = "WARNING"
@@ -15,17 +15,11 @@ class PsfGallery(mn.Scene):
         # opposite of mn.BLUE
         # bc = mn.ManimColor("#A73B22")
 
-        x = np.linspace(-5, 5, 100)
-        y = np.linspace(-5, 5, 100)
-
-        gauss = gauss2D(x, y)
-        donut = donut2D(x, y)
-
-        gaussim = mn.ImageMobject(colorize(gauss, c=mn.YELLOW)).scale(5)
-        donutim = mn.ImageMobject(colorize(donut, c=mn.YELLOW)).scale(5)
+        gaussim = mn.ImageMobject(psf_sprite(color=mn.YELLOW, grid=(-5, 5, 100))).scale(5)
+        donutim = mn.ImageMobject(psf_sprite('donut', color=mn.YELLOW, grid=(-5, 5, 100))).scale(5)
 
         # STED excitation + depletion
-        gaussim2 = mn.ImageMobject(np.maximum(colorize(gauss, c=mn.YELLOW), colorize(donut, c=mn.MAROON))).scale(5)
+        gaussim2 = mn.ImageMobject(sted_sprite(1, ex_color=mn.YELLOW, sted_color=mn.MAROON, grid=(-5, 5, 100))).scale(5)
         # donutim2 = mn.ImageMobject(colorize(donut, c=mn.BLUE), invert=True).scale(5)
 
         gaussim.set_x(4)
@@ -48,14 +42,9 @@ class PsfFit(mn.Scene):
         # opposite of mn.BLUE
         # bc = mn.ManimColor("#A73B22")
 
-        x = np.linspace(-5, 5, 100)
-        y = np.linspace(-5, 5, 100)
-
         p = -2.9
 
-        gauss = gauss2D(x, y)
-
-        gaussim = mn.ImageMobject(colorize(gauss, c=FL_COLOR)).scale(5)
+        gaussim = mn.ImageMobject(psf_sprite(color=FL_COLOR, grid=(-5, 5, 100))).scale(5)
 
         flpos = [p, 0, 0]
 
@@ -0,0 +1,187 @@
+"""
+Point-scanning (confocal/STED) image formation.
+
+The raster-scanned image of a ground-truth emitter map is its convolution
+with the effective scan PSF, computed with FFTs over blocks of scan lines so
+that partial images are available while the rest of the scan is computed.
+"""
+
+import numpy as np
+
+from psf import gauss2D, sted2D
+
+try:
+    import scipy.fft as _fft
+    _FFT_KW = {'workers': -1}
+except ImportError:
+    _fft = np.fft
+    _FFT_KW = {}
+
+def _fast_len(n):
+    return _fft.next_fast_len(n, real=True) if hasattr(_fft, 'next_fast_len') else n
+
+def _convolve_same(a, k):
+    # Same-size linear convolution of two small 2D arrays
+    shape = (a.shape[0]+k.shape[0]-1, a.shape[1]+k.shape[1]-1)
+    fshape = tuple(_fast_len(n) for n in shape)
+    full = _fft.irfft2(_fft.rfft2(a, fshape, **_FFT_KW)*_fft.rfft2(k, fshape, **_FFT_KW), fshape, **_FFT_KW)
+    r, c = k.shape[0]//2, k.shape[1]//2
+    return full[r:r+a.shape[0], c:c+a.shape[1]]
+
+def confocal_psf(excitation, emission=None, pinhole=None, pixel_size=1):
+    """
+    Effective point-scanning PSF, excitation * (emission convolved with the pinhole).
+
+    Parameters
+    ----------
+    excitation : np.array
+        (h, w) excitation intensity sampled at the scan pixel size, e.g. a
+        gauss2D, sted2D or widefield_psf.intensity_psf(widefield_psf_2d(...)).
+    emission : np.array
+        Detection PSF on the same grid, defaults to excitation.
+    pinhole : float
+        Pinhole radius (back-projected to the sample, same units as
+        pixel_size). None leaves the detector open, so the excitation alone
+        sets the resolution.
+    pixel_size : float
+        Scan step.
+
+    Returns
+    -------
+    np.array
+        Effective PSF normalized to a peak of 1.
+    """
+    excitation = np.asarray(excitation)
+    if pinhole is None:
+        h = excitation
+    else:
+        emission = excitation if emission is None else np.asarray(emission)
+        r = pinhole/pixel_size
+        n = int(np.ceil(r))
+        yy, xx = np.mgrid[-n:n+1, -n:n+1]
+        disk = (xx*xx+yy*yy <= r*r).astype(emission.dtype)
+        h = excitation*_convolve_same(emission, disk)
+    return h/h.max()
+
+def scan_psf(kind='gauss', sig=1, pixel_size=0.1, saturation=10, b=0, pinhole=None, n_sigma=4, dtype=np.float32):
+    """
+    Effective confocal ('gauss') or STED ('sted') scan PSF on a grid of step
+    pixel_size spanning +/- n_sigma*sig.
+
+    The excitation is gauss2D(sig), or sted2D(saturation, b) for STED, and
+    the detection a gauss2D(sig) behind an optional pinhole (see confocal_psf).
+    """
+    half = int(np.ceil(n_sigma*sig/pixel_size))
+    x = np.arange(-half, half+1)*pixel_size
+    emission = gauss2D(x, x, sig=sig, dtype=dtype)
+    if kind == 'gauss':
+        excitation = emission
+    elif kind == 'sted':
+        excitation = sted2D(x, x, saturation, sig=sig, b=b, dtype=dtype)
+    else:
+        raise ValueError(f"Unknown scan PSF kind '{kind}', expected 'gauss' or 'sted'")
+    return confocal_psf(excitation, emission, pinhole, pixel_size).astype(dtype, copy=False)
+
+def emitter_map(positions, shape, pixel_size=1, origin=(0, 0), brightness=1, dtype=np.float32):
+    """
+    Ground-truth map of point emitters binned onto the scan grid.
+
+    positions are (K, 2) (row, column) coordinates in the units of
+    pixel_size, measured from origin. Emitters outside the grid are dropped.
+    """
+    positions = np.atleast_2d(np.asarray(positions, dtype=float))
+    idx = np.floor((positions-np.asarray(origin))/pixel_size).astype(np.intp)
+    keep = np.all((idx >= 0) & (idx < np.asarray(shape)), axis=1)
+    w = np.broadcast_to(np.asarray(brightness, dtype=float), (positions.shape[0],))[keep]
+    flat = np.bincount(np.ravel_multi_index(idx[keep].T, shape), weights=w, minlength=shape[0]*shape[1])
+    return flat.reshape(shape).astype(dtype)
+
+def add_noise(image, photons=None, readout=0, offset=0, rng=None, dtype=np.float32):
+    """
+    Shot and camera noise, vectorized over the whole array.
+
+    image is scaled so that 1 corresponds to photons detected photons and
+    Poisson sampled (skipped if photons is None), then Gaussian readout noise
+    of standard deviation readout and a constant offset are added.
+    """
+    rng = np.random.default_rng(rng)
+    if photons is not None:
+        image = rng.poisson(np.maximum(image, 0)*photons).astype(dtype)
+    else:
+        image = np.array(image, dtype=dtype)
+    if readout:
+        image += readout*rng.standard_normal(image.shape, dtype=np.float32)
+    if offset:
+        image += offset
+    return image
+
+def raster_scan(sample, psf, block_rows=128, photons=None, readout=0, offset=0, rng=None, dtype=np.float32):
+    """
+    Stream the raster-scanned image of sample, one block of scan lines at a time.
+
+    Each block is the FFT convolution of the sample rows it sees with the
+    scan PSF, so the first lines are available without computing the whole
+    image. Noise (see add_noise) is drawn per block from one generator.
+
+    Parameters
+    ----------
+    sample : np.array
+        (H, W) ground-truth emitter map, e.g. from emitter_map.
+    psf : np.array
+        (h, w) effective scan PSF on the same grid, e.g. from scan_psf.
+    block_rows : int
+        Scan lines per block. Larger blocks amortize the FFTs better, 1
+        streams single lines.
+    photons, readout, offset, rng
+        Noise model, see add_noise. No noise is added if photons is None and
+        readout is 0.
+    dtype : np.dtype
+        Working and output precision.
+
+    Yields
+    ------
+    row : int
+        Index of the first scan line of the block.
+    lines : np.array
+        (n, W) block of scan lines.
+    """
+    sample = np.asarray(sample, dtype=dtype)
+    H, W = sample.shape
+    # the signal at scan position s is sum_r sample(r) psf(r-s), i.e. a
+    # convolution with the mirrored PSF
+    kernel = np.ascontiguousarray(np.asarray(psf, dtype=dtype)[::-1, ::-1])
+    kh, kw = kernel.shape
+    # psf is centered on (kh//2, kw//2), which the flip moves to
+    # (kh-1-kh//2, kw-1-kw//2); the two differ for even sizes
+    ch, cw = (kh-1) - kh//2, (kw-1) - kw//2
+    block_rows = max(min(block_rows, H), 1)
+
+    fshape = (_fast_len(block_rows+kh-1), _fast_len(W+kw-1))
+    K = _fft.rfft2(kernel, fshape, **_FFT_KW)
+    slab = np.zeros((block_rows+kh-1, W), dtype=dtype)
+    noisy = photons is not None or readout or offset
+    rng = np.random.default_rng(rng) if noisy else None
+
+    for r0 in range(0, H, block_rows):
+        n = min(block_rows, H-r0)
+        # sample rows r0+ch-(kh-1) .. r0+n+ch, zero outside the sample
+        a = r0+ch-(kh-1)
+        lo, hi = max(a, 0), min(r0+n+ch, H)
+        slab[...] = 0
+        slab[lo-a:hi-a] = sample[lo:hi]
+
+        full = _fft.irfft2(_fft.rfft2(slab, fshape, **_FFT_KW)*K, fshape, **_FFT_KW)
+        lines = full[kh-1:kh-1+n, cw:cw+W].astype(dtype, copy=False)
+        np.maximum(lines, 0, out=lines)  # FFT round-off around zero
+
+        if noisy:
+            lines = add_noise(lines, photons, readout, offset, rng, dtype)
+        yield r0, lines
+
+def scan_image(sample, psf, block_rows=512, **kwargs):
+    """ Full raster-scanned image, see raster_scan for the arguments. """
+    sample = np.asarray(sample)
+    out = np.empty(sample.shape, dtype=kwargs.get('dtype', np.float32))
+    for r0, lines in raster_scan(sample, psf, block_rows, **kwargs):
+        out[r0:r0+lines.shape[0]] = lines
+    return out
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Render every mn.Scene in this directory in parallel, skipping scenes that
+have not changed since their last successful render.
+
+A scene is any class deriving from a *Scene class, directly or through
+other scenes of the same file. Shared base classes that are not scenes of
+their own set ABSTRACT = True in their class body and are not rendered.
+
+Scenes are rendered from the repository root, where both the modules next
+to the scenes and the shared ones at the root (splat.py) are importable;
+run single scenes the same way, e.g.
+    manim render manim/scanning_microscopy.py RasterScan
+
+A scene is considered changed when the source of its class or of its
+in-file base classes, the module-level code of its file (constants,
+helpers) or any local module it imports (psf.py, sprites.py, ../splat.py,
+...) differs from the last successful render.
+
+Usage:
+    python render_all.py [-j 8] [-q l] [--force] [--dry-run] [file.py ...] [-s SceneName ...]
+"""
+
+import os
+import ast
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)  # shared modules such as splat.py
+STATE_FILE = os.path.join(HERE, '.render_state.json')
+
+def _sha1(text):
+    return hashlib.sha1(text.encode()).hexdigest()
+
+def _bases(node):
+    # (name, local) per base: class Foo(Bar) is local, class Foo(mn.Scene) is not
+    for base in node.bases:
+        if isinstance(base, ast.Attribute):
+            yield base.attr, False
+        elif isinstance(base, ast.Name):
+            yield base.id, True
+
+def _is_abstract(node):
+    # class Foo(mn.Scene): ABSTRACT = True
+    for stmt in node.body:
+        if isinstance(stmt, ast.Assign) and any(getattr(t, 'id', None) == 'ABSTRACT' for t in stmt.targets):
+            return isinstance(stmt.value, ast.Constant) and stmt.value.value is True
+    return False
+
+def scene_classes(tree):
+    """
+    {name: ast.ClassDef} of the classes of a module deriving from a *Scene
+    class (mn.Scene, Scene, MovingCameraScene, ...) directly or through
+    other classes of the module. Abstract bases are included.
+    """
+    classes = {n.name: n for n in tree.body if isinstance(n, ast.ClassDef)}
+    scenes = {}
+    # repeat until no class is added: a subclass may be defined before its base
+    changed = True
+    while changed:
+        changed = False
+        for name, node in classes.items():
+            if name in scenes:
+                continue
+            for base, local in _bases(node):
+                if base in scenes or (base.endswith('Scene') and not (local and base in classes)):
+                    scenes[name] = node
+                    changed = True
+                    break
+    return scenes
+
+def _ancestors(name, scenes):
+    # names of the in-module scene classes name derives from
+    found, todo = [], [name]
+    while todo:
+        for base, local in _bases(scenes[todo.pop()]):
+            if local and base in scenes and base not in found:
+                found.append(base)
+                todo.append(base)
+    return found
+
+def _local_imports(tree):
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(a.name.split('.')[0] for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            names.add(node.module.split('.')[0])
+    return {n for n in names if _module_path(n) is not None}
+
+def _module_path(module):
+    # local modules live next to the scenes or at the repository root
+    for d in (HERE, ROOT):
+        path = os.path.join(d, f"{module}.py")
+        if os.path.exists(path):
+            return path
+    return None
+
+def dependency_hash(module, _seen=None):
+    """ Hash of a local module's source and, recursively, the local modules it imports. """
+    _seen = set() if _seen is None else _seen
+    if module in _seen:
+        return ''
+    _seen.add(module)
+
+    with open(_module_path(module)) as f:
+        src = f.read()
+    h = [_sha1(src)]
+    for dep in sorted(_local_imports(ast.parse(src))):
+        h.append(dependency_hash(dep, _seen))
+    return _sha1(''.join(h))
+
+def find_scenes(filename):
+    """ Return {scene name: hash} for the renderable scenes defined in filename. """
+    with open(filename) as f:
+        src = f.read()
+    tree = ast.parse(src)
+
+    scenes = scene_classes(tree)
+    class_lines = set()
+    for n in scenes.values():
+        class_lines.update(range(n.lineno-1, n.end_lineno))
+    lines = src.split('\n')
+    module_code = '\n'.join(l for i, l in enumerate(lines) if i not in class_lines)
+
+    deps = ''.join(dependency_hash(d) for d in sorted(_local_imports(tree)))
+    hashes = {}
+    for name, n in scenes.items():
+        if _is_abstract(n):
+            continue
+        # editing a base class re-renders all of its subclasses
+        classes = [n] + [scenes[a] for a in _ancestors(name, scenes)]
+        hashes[name] = _sha1(module_code + deps + ''.join(ast.get_source_segment(src, c) for c in classes))
+    return hashes
+
+def load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    return {}
+
+def save_state(state):
+    tmp = STATE_FILE + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, STATE_FILE)
+
+def render_scene(filename, scene, quality='l', extra_args=()):
+    """ Render one scene in its own manim process. Returns (returncode, wall time, output). """
+    # run from the root so that splat.py & co. import, media stays next to the scenes
+    cmd = [sys.executable, '-m', 'manim', 'render', f"-q{quality}", '--media_dir', os.path.join(HERE, 'media'),
+           *extra_args, os.path.join(HERE, filename), scene]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    return proc.returncode, time.perf_counter()-start, proc.stdout + proc.stderr
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help="Scene files (default: every .py here defining a Scene)")
+    parser.add_argument('-s', '--scenes', nargs='+', help="Only render these scenes")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="Parallel manim processes")
+    parser.add_argument('-q', '--quality', default='l', choices='lmhpk', help="manim quality flag")
+    parser.add_argument('--force', action='store_true', help="Render even if unchanged")
+    parser.add_argument('--dry-run', action='store_true', help="Only list what would be rendered")
+    args, extra = parser.parse_known_args(argv)
+
+    files = args.files or sorted(f for f in os.listdir(HERE) if f.endswith('.py') and f != os.path.basename(__file__))
+    state = load_state()
+
+    todo = []
+    for fn in files:
+        for scene, h in find_scenes(os.path.join(HERE, fn)).items():
+            if args.scenes and scene not in args.scenes:
+                continue
+            key = f"{fn}::{scene}::{args.quality}"
+            if args.force or state.get(key) != h:
+                todo.append((fn, scene, key, h))
+            else:
+                print(f"skip   {fn}::{scene} (unchanged)")
+
+    if args.dry_run:
+        for fn, scene, _, _ in todo:
+            print(f"render {fn}::{scene}")
+        return 0
+
+    # manim does the heavy lifting in its own processes, threads only wait on them
+    failed = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(args.jobs, 1)) as pool:
+        futures = {pool.submit(render_scene, fn, scene, args.quality, extra): (fn, scene, key, h)
+                   for fn, scene, key, h in todo}
+        for fut in as_completed(futures):
+            fn, scene, key, h = futures[fut]
+            rc, dt, out = fut.result()
+            if rc == 0:
+                state[key] = h
+                save_state(state)
+                print(f"ok     {fn}::{scene} {dt:.1f} s")
+            else:
+                failed += 1
+                print(f"FAILED {fn}::{scene} {dt:.1f} s\n{out}")
+
+    print(f"Rendered {len(todo)-failed}/{len(todo)} scenes in {time.perf_counter()-start:.1f} s")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
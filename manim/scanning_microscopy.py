@@ -1,7 +1,10 @@
 import manim as mn
 import numpy as np
 
-from psf import gauss1D, gauss2D, donut1D, donut2D, lorentzian1D, colorize
+from psf import gauss1D, donut1D, lorentzian1D, render_emitters, composite, sted_sigma
+from sprites import psf_sprite, sted_sprite, sted_sweep
+from tracks import TrackSet, linear_trajectory, gaussian_opacity, lorentzian_opacity
+from raster_scan import emitter_map, scan_psf, raster_scan
 
 mn.config.media_width = "75%"
 mn.config.verbosity = "WARNING"
@@ -13,36 +16,29 @@ EX_COLOR = mn.YELLOW  # excitation
 STED_COLOR = mn.MAROON  # STED beam
 FL_COLOR = mn.RED  # fluorophore
 
+# STED saturation factors (donut peak / I_sat) of the saturation sweeps,
+# giving effective PSF widths of about 0.5, 0.3, 0.2 and 0.1 sig
+STED_SATURATION = [1.6, 5.4, 12.7, 52.5]
+STED_B = 0.01  # residual STED intensity at the donut center
+
 class Gaussian(mn.Scene):
     def construct(self):
         
-        x = np.linspace(-5, 5, 100)
-        y = np.linspace(-5, 5, 100)
-        gauss = gauss2D(x, y)
-
-        gaussim = mn.ImageMobject(colorize(gauss, c=EX_COLOR)).scale(5)
+        gaussim = mn.ImageMobject(psf_sprite(color=EX_COLOR, grid=(-5, 5, 100))).scale(5)
         self.add(gaussim)
 
 class Donut(mn.Scene):
     def construct(self):
         
-        x = np.linspace(-5, 5, 100)
-        y = np.linspace(-5, 5, 100)
-        donut = donut2D(x, y)
-
-        donutim = mn.ImageMobject(colorize(donut, c=EX_COLOR)).scale(5)
+        donutim = mn.ImageMobject(psf_sprite('donut', color=EX_COLOR, grid=(-5, 5, 100))).scale(5)
         self.add(donutim)
         
 class MoveGaussian(mn.Scene):
     def construct(self):
         
-        x = np.linspace(-5, 5, 100)
-        y = np.linspace(-5, 5, 100)
-        gauss = gauss2D(x, y)
-
         line = mn.Line([0, 0, 0], [5, 0, 0])
 
-        gaussim = mn.ImageMobject(colorize(gauss, c=EX_COLOR)).scale(5)
+        gaussim = mn.ImageMobject(psf_sprite(color=EX_COLOR, grid=(-5, 5, 100))).scale(5)
         self.add(gaussim)
         self.play(mn.MoveAlongPath(gaussim, line), run_time=2, rate_func=mn.linear)
         self.wait()
@@ -83,20 +79,18 @@ class ScanSingleFlConfocal(mn.Scene):
 
         fl = mn.Dot(flpos, color=FL_COLOR)
 
-        x = np.linspace(-3, 3, 100)
-        y = np.linspace(-3, 3, 100)
-        flgauss = gauss2D(x, y)
-        flgaussim = mn.ImageMobject(colorize(flgauss, c=FL_COLOR)).scale(SCALE)
+        flgaussim = mn.ImageMobject(psf_sprite(color=FL_COLOR)).scale(SCALE)
         flgaussim.set_x(np.abs(flpos[0]))
         flgaussim.set_opacity(0)
 
-        gauss = gauss2D(x, y)
-        gaussim = mn.ImageMobject(colorize(gauss, c=EX_COLOR)).scale(SCALE)
+        gaussim = mn.ImageMobject(psf_sprite(color=EX_COLOR)).scale(SCALE)
         gaussim.set_opacity(OPACITY)
         gaussim.set_x(-5)
 
-        gaussim.add_updater(lambda z: z.set_x(p.get_value()))
-        flgaussim.add_updater(lambda z: z.set_opacity(OPACITY*np.exp(-8*(p.get_value()-flpos[0])**2)))
+        tracks = TrackSet(p, linear_trajectory(-5, [(-1, 2), (-5, 2), (-3, 1)], mn.config.frame_rate))
+        tracks.add([gaussim], x=tracks.p)
+        tracks.add([flgaussim], opacity=gaussian_opacity(tracks.p, flpos[0], OPACITY))
+        gaussim.add_updater(tracks.update)
         
         psf_text = mn.MathTex("\\sim 200 \\text{ nm}", font_size=40)
         psf_text.next_to(flgaussim, mn.UP)
@@ -121,26 +115,22 @@ class ScanTwoFlFarConfocal(mn.Scene):
         fl0 = mn.Dot(flpos0, color=FL_COLOR)
         fl1 = mn.Dot(flpos1, color=FL_COLOR)
 
-        x = np.linspace(-3, 3, 100)
-        y = np.linspace(-3, 3, 100)
-        flgauss0 = gauss2D(x, y)
-        flgaussim0 = mn.ImageMobject(colorize(flgauss0, c=FL_COLOR)).scale(SCALE)
+        flgaussim0 = mn.ImageMobject(psf_sprite(color=FL_COLOR)).scale(SCALE)
         flgaussim0.set_x(np.abs(flpos1[0]))
         flgaussim0.set_opacity(0)
 
-        flgauss1 = gauss2D(x, y)
-        flgaussim1 = mn.ImageMobject(colorize(flgauss1, c=FL_COLOR)).scale(SCALE)
+        flgaussim1 = mn.ImageMobject(psf_sprite(color=FL_COLOR)).scale(SCALE)
         flgaussim1.set_x(np.abs(flpos0[0]))
         flgaussim1.set_opacity(0)
 
-        gauss = gauss2D(x, y)
-        gaussim = mn.ImageMobject(colorize(gauss, c=EX_COLOR)).scale(SCALE)
+        gaussim = mn.ImageMobject(psf_sprite(color=EX_COLOR)).scale(SCALE)
         gaussim.set_opacity(OPACITY)
         gaussim.set_x(-5)
 
-        gaussim.add_updater(lambda z: z.set_x(p.get_value()))
-        flgaussim0.add_updater(lambda z: z.set_opacity(OPACITY*np.exp(-8*(p.get_value()-flpos0[0])**2)))
-        flgaussim1.add_updater(lambda z: z.set_opacity(OPACITY*np.exp(-8*(p.get_value()-flpos1[0])**2)))
+        tracks = TrackSet(p, linear_trajectory(-5, [(-1, 3), (-5, 3)], mn.config.frame_rate))
+        tracks.add([gaussim], x=tracks.p)
+        tracks.add([flgaussim0, flgaussim1], opacity=gaussian_opacity(tracks.p, [flpos0[0], flpos1[0]], OPACITY))
+        gaussim.add_updater(tracks.update)
         
         self.add(gaussim, flgaussim0, flgaussim1, fl0, fl1)
 
@@ -159,26 +149,22 @@ class ScanTwoFlCloseConfocal(mn.Scene):
         fl0 = mn.Dot(flpos0, color=FL_COLOR)
         fl1 = mn.Dot(flpos1, color=FL_COLOR)
 
-        x = np.linspace(-3, 3, 100)
-        y = np.linspace(-3, 3, 100)
-        flgauss0 = gauss2D(x, y)
-        flgaussim0 = mn.ImageMobject(colorize(flgauss0, c=FL_COLOR)).scale(SCALE)
+        flgaussim0 = mn.ImageMobject(psf_sprite(color=FL_COLOR)).scale(SCALE)
         flgaussim0.set_x(np.abs(flpos1[0]))
         flgaussim0.set_opacity(0)
 
-        flgauss1 = gauss2D(x, y)
-        flgaussim1 = mn.ImageMobject(colorize(flgauss1, c=FL_COLOR)).scale(SCALE)
+        flgaussim1 = mn.ImageMobject(psf_sprite(color=FL_COLOR)).scale(SCALE)
         flgaussim1.set_x(np.abs(flpos0[0]))
         flgaussim1.set_opacity(0)
 
-        gauss = gauss2D(x, y)
-        gaussim = mn.ImageMobject(colorize(gauss, c=EX_COLOR)).scale(SCALE)
+        gaussim = mn.ImageMobject(psf_sprite(color=EX_COLOR)).scale(SCALE)
         gaussim.set_opacity(OPACITY)
         gaussim.set_x(-5)
 
-        gaussim.add_updater(lambda z: z.set_x(p.get_value()))
-        flgaussim0.add_updater(lambda z: z.set_opacity(OPACITY*np.exp(-8*(p.get_value()-flpos0[0])**2)))
-        flgaussim1.add_updater(lambda z: z.set_opacity(OPACITY*np.exp(-8*(p.get_value()-flpos1[0])**2)))
+        tracks = TrackSet(p, linear_trajectory(-5, [(-1, 3), (-5, 3)], mn.config.frame_rate))
+        tracks.add([gaussim], x=tracks.p)
+        tracks.add([flgaussim0, flgaussim1], opacity=gaussian_opacity(tracks.p, [flpos0[0], flpos1[0]], OPACITY))
+        gaussim.add_updater(tracks.update)
         
         self.add(gaussim, flgaussim0, flgaussim1, fl0, fl1)
 
@@ -201,20 +187,15 @@ class ScanTwoFlCloseConfocalSMLM(mn.Scene):
 
         FL_ACTIVE_COLOR = mn.PINK
 
-        x = np.linspace(-3, 3, 100)
-        y = np.linspace(-3, 3, 100)
-        flgauss0 = gauss2D(x, y)
-        flgaussim0 = mn.ImageMobject(colorize(flgauss0, c=FL_COLOR)).scale(SCALE)
+        flgaussim0 = mn.ImageMobject(psf_sprite(color=FL_COLOR)).scale(SCALE)
         flgaussim0.set_x(np.abs(flpos1[0]))
         flgaussim0.set_opacity(op0.get_value())
 
-        flgauss1 = gauss2D(x, y)
-        flgaussim1 = mn.ImageMobject(colorize(flgauss1, c=FL_COLOR)).scale(SCALE)
+        flgaussim1 = mn.ImageMobject(psf_sprite(color=FL_COLOR)).scale(SCALE)
         flgaussim1.set_x(np.abs(flpos0[0]))
         flgaussim1.set_opacity(op1.get_value())
 
-        gauss = gauss2D(x, y)
-        gaussim = mn.ImageMobject(colorize(gauss, c=EX_COLOR)).scale(SCALE)
+        gaussim = mn.ImageMobject(psf_sprite(color=EX_COLOR)).scale(SCALE)
         gaussim.set_opacity(OPACITY)
         gaussim.set_x(-5)
 
@@ -255,34 +236,29 @@ class ScanSingleFlSTED(mn.Scene):
 
         fl = mn.Dot(flpos, color=FL_COLOR)
 
-        x = np.linspace(-3, 3, 100)
-        y = np.linspace(-3, 3, 100)
-        
-        gauss = gauss2D(x, y)
-        flgaussim = mn.ImageMobject(colorize(gauss, c=FL_COLOR)).scale(SCALE)
+        flgaussim = mn.ImageMobject(psf_sprite(color=FL_COLOR)).scale(SCALE)
         flgaussim.set_x(np.abs(flpos[0]))
         flgaussim.set_opacity(0)
 
-        flstedim = mn.ImageMobject(colorize(gauss, c=FL_COLOR)).scale(SCALE/3)
+        flstedim = mn.ImageMobject(psf_sprite(color=FL_COLOR)).scale(SCALE/3)
         flstedim.set_x(np.abs(flpos[0]))
         flstedim.set_opacity(0)
 
-        gaussim = mn.ImageMobject(colorize(gauss, c=EX_COLOR)).scale(SCALE)
+        gaussim = mn.ImageMobject(psf_sprite(color=EX_COLOR)).scale(SCALE)
         gaussim.set_opacity(OPACITY)
         gaussim.set_x(-5)
 
-        donut = donut2D(x, y)
-        gauss05 = gauss2D(x, y, sig=0.5)
-        donutim = mn.ImageMobject(np.maximum(colorize(gauss05, c=EX_COLOR), colorize(donut, c=STED_COLOR))).scale(SCALE)
+        donutim = mn.ImageMobject(sted_sprite(0.5, ex_color=EX_COLOR, sted_color=STED_COLOR)).scale(SCALE)
         donutim.set_opacity(0)
 
-        gaussim.add_updater(lambda z: z.set_x(p.get_value()))
-        donutim.add_updater(lambda z: z.set_x(p.get_value()))
-        flgaussim.add_updater(lambda z: z.set_opacity(OPACITY*np.exp(-8*(p.get_value()-flpos[0])**2)))
+        tracks = TrackSet(p, linear_trajectory(-5, [(flpos[0], 2), (-1, 2), (-5, 2), (-3, 1)], mn.config.frame_rate))
+        tracks.add([gaussim, donutim], x=tracks.p)
+        tracks.add([flgaussim], opacity=gaussian_opacity(tracks.p, flpos[0], OPACITY))
 
         # lorentzian
         gamma = OPACITY
-        flstedim.add_updater(lambda z: z.set_opacity(OPACITY/(np.pi*gamma*(1+((p.get_value()-flpos[0])/gamma)**2))))
+        tracks.add([flstedim], opacity=lorentzian_opacity(tracks.p, flpos[0], OPACITY, gamma))
+        gaussim.add_updater(tracks.update)
         
         psf_text = mn.MathTex("30 \\sim 50 \\text{ nm}", font_size=40)
         psf_text.next_to(flgaussim, mn.UP)
@@ -352,47 +328,48 @@ class ScanTwoFlCloseSTED(mn.Scene):
         fl0 = mn.Dot(flpos0, color=FL_COLOR)
         fl1 = mn.Dot(flpos1, color=FL_COLOR)
 
-        x = np.linspace(-3, 3, 100)
-        y = np.linspace(-3, 3, 100)
-        gauss = gauss2D(x, y)
-
-        flgaussim0 = mn.ImageMobject(colorize(gauss, c=FL_COLOR)).scale(SCALE)
+        flgaussim0 = mn.ImageMobject(psf_sprite(color=FL_COLOR)).scale(SCALE)
         flgaussim0.set_x(np.abs(flpos1[0]))
         flgaussim0.set_opacity(0)
 
-        flgaussim1 = mn.ImageMobject(colorize(gauss, c=FL_COLOR)).scale(SCALE)
+        flgaussim1 = mn.ImageMobject(psf_sprite(color=FL_COLOR)).scale(SCALE)
         flgaussim1.set_x(np.abs(flpos0[0]))
         flgaussim1.set_opacity(0)
 
-        gaussim = mn.ImageMobject(colorize(gauss, c=EX_COLOR)).scale(SCALE)
+        gaussim = mn.ImageMobject(psf_sprite(color=EX_COLOR)).scale(SCALE)
         gaussim.set_opacity(OPACITY)
         gaussim.set_x(leftscan)
 
-        donut = np.minimum(donut2D(x, y, a=1), 1)
-        gauss05 = gauss2D(x, y, sig=0.3)
-        donutim = mn.ImageMobject(np.maximum(colorize(gauss05, c=EX_COLOR), colorize(donut, c=STED_COLOR))).scale(SCALE)
+        donutim = mn.ImageMobject(sted_sprite(0.3, a=1, ex_color=EX_COLOR, sted_color=STED_COLOR)).scale(SCALE)
         donutim.set_opacity(0)
         donutim.set_x(leftscan)
 
-        gaussim.add_updater(lambda z: z.set_x(p.get_value()))
-        donutim.add_updater(lambda z: z.set_x(p.get_value()))
-        flgaussim0.add_updater(lambda z: z.set_opacity(OPACITY*np.exp(-8*(p.get_value()-flpos0[0])**2)))
-        flgaussim1.add_updater(lambda z: z.set_opacity(OPACITY*np.exp(-8*(p.get_value()-flpos1[0])**2)))
+        fps = mn.config.frame_rate
+        flpos = [flpos0[0], flpos1[0]]
+
+        # confocal approach, Gaussian detection
+        confocal = TrackSet(p, linear_trajectory(leftscan, [(flpos0[0], 1)], fps))
+        confocal.add([gaussim, donutim], x=confocal.p)
+        confocal.add([flgaussim0, flgaussim1], opacity=gaussian_opacity(confocal.p, flpos, OPACITY))
+        gaussim.add_updater(confocal.update)
+
+        # STED scan, capped Lorentzian detection
+        gamma = 0.02
+        sted = TrackSet(p, linear_trajectory(flpos0[0], [(rightscan, 3), (leftscan, 3), (flpos1[0], 3)], fps))
+        sted.add([gaussim, donutim], x=sted.p)
+        sted.add([flgaussim0, flgaussim1], opacity=lorentzian_opacity(sted.p, flpos, a=OPACITY, gamma=gamma, cap=OPACITY))
         
         self.add(gaussim, flgaussim0, flgaussim1, fl0, fl1)
 
         self.play(p.animate.set_value(flpos0[0]), run_time=1, rate_func=mn.linear)
-        flgaussim0.clear_updaters()
-        flgaussim1.clear_updaters()
+        gaussim.remove_updater(confocal.update)
         self.play(donutim.animate.set_opacity(OPACITY), 
                   flgaussim1.animate.set_opacity(0), 
                   flgaussim0.animate.scale(0.3), 
                   run_time=3, rate_func=mn.linear)
         self.wait(OPACITY)
         flgaussim1.scale(0.3)
-        gamma = 0.02
-        flgaussim0.add_updater(lambda z: z.set_opacity(np.minimum(OPACITY/(np.pi*gamma*(1+((p.get_value()-flpos0[0])/gamma)**2)),OPACITY)))
-        flgaussim1.add_updater(lambda z: z.set_opacity(np.minimum(OPACITY/(np.pi*gamma*(1+((p.get_value()-flpos1[0])/gamma)**2)),OPACITY)))
+        gaussim.add_updater(sted.update)
         self.play(p.animate.set_value(rightscan), run_time=3, rate_func=mn.linear)
         self.play(p.animate.set_value(leftscan), run_time=3, rate_func=mn.linear)
         self.play(p.animate.set_value(flpos1[0]), run_time=3, rate_func=mn.linear)
@@ -414,62 +391,61 @@ class SaturateTwoFlCloseSTED(mn.Scene):
         fl0 = mn.Dot(flpos0, color=FL_COLOR)
         fl1 = mn.Dot(flpos1, color=FL_COLOR)
 
-        x = np.linspace(-3, 3, 100)
-        y = np.linspace(-3, 3, 100)
-        gauss = gauss2D(x, y)
+        # fluorophore images at the effective PSF width of each saturation
+        flsweep = [mn.ImageMobject(psf_sprite(sig=sted_sigma(1, z), color=FL_COLOR)).scale(SCALE)
+                   for z in STED_SATURATION]
 
-        flgaussim0 = mn.ImageMobject(colorize(gauss, c=FL_COLOR)).scale(SCALE/3)
+        flgaussim0 = flsweep[0].copy()
         flgaussim0.set_x(np.abs(flpos1[0]))
         flgaussim0.set_opacity(0)
 
-        flgaussim1 = mn.ImageMobject(colorize(gauss, c=FL_COLOR)).scale(SCALE/3)
+        flgaussim1 = flsweep[0].copy()
         flgaussim1.set_x(np.abs(flpos0[0]))
         flgaussim1.set_opacity(0)
+        for im in flsweep:
+            im.set_x(np.abs(flpos0[0]))
+
+        # effective PSF over the depleted region, whole sweep in one batch
+        sweep = sted_sweep(STED_SATURATION, b=STED_B, ex_color=EX_COLOR, sted_color=STED_COLOR)
 
-        donut = donut2D(x, y)
-        gauss05 = gauss2D(x, y, sig=0.5)
-        donutim05 = mn.ImageMobject(np.maximum(colorize(gauss05, c=EX_COLOR), colorize(donut, c=STED_COLOR))).scale(SCALE)
+        donutim05 = mn.ImageMobject(sweep[0]).scale(SCALE)
         donutim05.set_opacity(OPACITY)
         donutim05.set_x(-5)
 
-        donut02 = np.minimum(donut2D(x, y, a=1, b=0.1), 1)
-        gauss02 = gauss2D(x, y, sig=0.3)
-        donutim07 = mn.ImageMobject(np.maximum(colorize(gauss02, c=EX_COLOR), colorize(donut02, c=STED_COLOR))).scale(SCALE)
+        donutim07 = mn.ImageMobject(sweep[1]).scale(SCALE)
         donutim07.set_opacity(0)
         donutim07.set_x(-5)
 
-        donut022 = np.minimum(donut2D(x, y, a=2, b=0.1), 1)
-        gauss022 = gauss2D(x, y, sig=0.2)
-        donutim072 = mn.ImageMobject(np.maximum(colorize(gauss022, c=EX_COLOR), colorize(donut022, c=STED_COLOR))).scale(SCALE)
+        donutim072 = mn.ImageMobject(sweep[2]).scale(SCALE)
         donutim072.set_opacity(0)
         donutim072.set_x(-5)
 
-        donut0222 = np.minimum(donut2D(x, y, a=4, b=0.1), 1)
-        gauss0222 = gauss2D(x, y, sig=0.1)
-        donutim0722 = mn.ImageMobject(np.maximum(colorize(gauss0222, c=EX_COLOR), colorize(donut0222, c=STED_COLOR))).scale(SCALE)
+        donutim0722 = mn.ImageMobject(sweep[3]).scale(SCALE)
         donutim0722.set_opacity(0)
         donutim0722.set_x(-5)
 
-        donutim05.add_updater(lambda z: z.set_x(p.get_value()))
-        donutim07.add_updater(lambda z: z.set_x(p.get_value()))
-        donutim072.add_updater(lambda z: z.set_x(p.get_value()))
-        donutim0722.add_updater(lambda z: z.set_x(p.get_value()))
-        flgaussim0.add_updater(lambda z: z.set_opacity(OPACITY*np.exp(-8*(p.get_value()-flpos0[0])**2)))
-        flgaussim1.add_updater(lambda z: z.set_opacity(OPACITY*np.exp(-8*(p.get_value()-flpos1[0])**2)))
+        # the beam stays parked at p, so the tracks have a single sample. The
+        # updaters live on mobjects that are not animated themselves, except
+        # for the fluorophore under the beam, which is released before it fades
+        gamma = 0.02
+        tracks = TrackSet(p, [p.get_value()])
+        tracks.add([donutim05, donutim07, donutim072, donutim0722], x=tracks.p)
+        tracks.add([flgaussim0], opacity=lorentzian_opacity(tracks.p, flpos0[0], a=OPACITY, gamma=gamma, cap=OPACITY))
+        flgaussim0.add_updater(tracks.update)
+        fl1_track = TrackSet(p, tracks.p)
+        fl1_track.add([flgaussim1], opacity=lorentzian_opacity(tracks.p, flpos1[0], a=OPACITY, gamma=gamma, cap=OPACITY))
+        flgaussim1.add_updater(fl1_track.update)
         
         self.add(donutim05, flgaussim0, flgaussim1, fl0, fl1)
 
-        gamma = 0.02
-        flgaussim0.add_updater(lambda z: z.set_opacity(np.minimum(OPACITY/(np.pi*gamma*(1+((p.get_value()-flpos0[0])/gamma)**2)),OPACITY)))
-        flgaussim1.add_updater(lambda z: z.set_opacity(np.minimum(OPACITY/(np.pi*gamma*(1+((p.get_value()-flpos1[0])/gamma)**2)),OPACITY)))
         self.play(donutim05.animate.set_opacity(0),
                   donutim07.animate.set_opacity(OPACITY), 
-                  flgaussim1.animate.scale(0.75),
+                  mn.Transform(flgaussim1, flsweep[1]),
                   run_time=1, rate_func=mn.linear)
         self.wait(1)
         self.play(donutim07.animate.set_opacity(0),
                   donutim072.animate.set_opacity(OPACITY), 
-                  flgaussim1.animate.scale(0.75),
+                  mn.Transform(flgaussim1, flsweep[2]),
                   run_time=1, rate_func=mn.linear)
         self.wait(1)
         flgaussim1.clear_updaters()
@@ -507,40 +483,31 @@ class PlotDonutSTED(mn.Scene):
         fl0 = mn.Dot(flpos0, color=FL_COLOR)
         fl1 = mn.Dot(flpos1, color=FL_COLOR)
 
-        x = np.linspace(-3, 3, 100)
-        y = np.linspace(-3, 3, 100)
-
         b = mn.ValueTracker(0.1)
         a = mn.ValueTracker(0)
         a2 = mn.ValueTracker(3*np.pi/2)
         g = mn.ValueTracker(1)
 
-        gauss = np.minimum(gauss2D(x, y, b=b.get_value()), 1)
-
-        gaussim = mn.ImageMobject(colorize(gauss, c=EX_COLOR)).scale(SCALE)
+        gaussim = mn.ImageMobject(psf_sprite(b=b.get_value(), color=EX_COLOR)).scale(SCALE)
         gaussim.set_opacity(OPACITY)
         gaussim.set_x(p.get_value())
 
-        donut02 = np.minimum(donut2D(x, y, a=1, b=0.1), 1)
-        gauss02 = gauss2D(x, y, sig=0.3)
-        donutim07 = mn.ImageMobject(np.maximum(colorize(gauss02, c=EX_COLOR), colorize(donut02, c=STED_COLOR))).scale(SCALE)
+        sweep = sted_sweep(STED_SATURATION[1:], b=STED_B, ex_color=EX_COLOR, sted_color=STED_COLOR)
+        perfect, = sted_sweep(STED_SATURATION[-1:], b=0, ex_color=EX_COLOR, sted_color=STED_COLOR)
+
+        donutim07 = mn.ImageMobject(sweep[0]).scale(SCALE)
         donutim07.set_opacity(0)
         donutim07.set_x(p.get_value())
 
-        donut022 = np.minimum(donut2D(x, y, a=2, b=0.1), 1)
-        gauss022 = gauss2D(x, y, sig=0.2)
-        donutim072 = mn.ImageMobject(np.maximum(colorize(gauss022, c=EX_COLOR), colorize(donut022, c=STED_COLOR))).scale(SCALE)
+        donutim072 = mn.ImageMobject(sweep[1]).scale(SCALE)
         donutim072.set_opacity(0)
         donutim072.set_x(p.get_value())
 
-        donut0222 = np.minimum(donut2D(x, y, a=4, b=0.1), 1)
-        gauss0222 = gauss2D(x, y, sig=0.1)
-        donutim0722 = mn.ImageMobject(np.maximum(colorize(gauss0222, c=EX_COLOR), colorize(donut0222, c=STED_COLOR))).scale(SCALE)
+        donutim0722 = mn.ImageMobject(sweep[2]).scale(SCALE)
         donutim0722.set_opacity(0)
         donutim0722.set_x(p.get_value())
 
-        donut02222 = np.minimum(donut2D(x, y, a=4, b=0), 1)
-        donutim07222 = mn.ImageMobject(np.maximum(colorize(gauss0222, c=EX_COLOR), colorize(donut02222, c=STED_COLOR))).scale(SCALE)
+        donutim07222 = mn.ImageMobject(perfect).scale(SCALE)
         donutim07222.set_opacity(0)
         donutim07222.set_x(p.get_value())
 
@@ -614,4 +581,134 @@ class PlotDonutSTED(mn.Scene):
                   g.animate.set_value(1),
                   run_time=1, rate_func=mn.linear)
         self.wait(2)
-        self.wait()
\ No newline at end of file
+        self.wait()
+
+class ScanFluorophores(mn.Scene):
+    """
+    Scan a confocal or STED spot along a line of any number of fluorophores.
+
+    Subclasses set EMITTERS (x positions on the scan line), MODALITY
+    ('confocal' or 'sted') and SATURATION (STED donut peak / I_sat, the
+    effective spot narrows to psf.sted_sigma as in the sted_sweep sprite
+    shown). Every frame the detected emission of all fluorophores is
+    rendered into one pixel buffer.
+    """
+    ABSTRACT = True  # not rendered itself, see render_all.py
+    EMITTERS = np.array([-3.1, -2.9])
+    MODALITY = 'confocal'
+    SATURATION = STED_SATURATION[2]
+    SCAN = (-5, [(-1, 3), (-5, 3)])  # start, [(target, run_time), ...]
+    IMAGE_EXTENT = (0, 7, -2, 2)  # x0, x1, y0, y1 of the detected image
+    IMAGE_SHAPE = (120, 420)
+    SIG = 0.5  # width of a fluorophore's confocal image
+
+    def construct(self):
+
+        start, segments = self.SCAN
+        p = mn.ValueTracker(start)
+
+        # effective spot width relative to the confocal one
+        shrink = sted_sigma(1, self.SATURATION) if self.MODALITY == 'sted' else 1
+        k = 8/shrink**2
+        sig = self.SIG*shrink
+
+        fls = mn.VGroup(*[mn.Dot([x, 0, 0], radius=0.04, color=FL_COLOR) for x in self.EMITTERS])
+
+        if self.MODALITY == 'sted':
+            spot, = sted_sweep([self.SATURATION], b=STED_B, ex_color=EX_COLOR, sted_color=STED_COLOR)
+            spotim = mn.ImageMobject(spot).scale(SCALE)
+        else:
+            spotim = mn.ImageMobject(psf_sprite(color=EX_COLOR)).scale(SCALE)
+        spotim.set_opacity(OPACITY)
+        spotim.set_x(start)
+        spotim.add_updater(lambda z: z.set_x(p.get_value()))
+
+        # Emission image, fluorophores mirrored onto the right half as in the other scenes
+        x0, x1, y0, y1 = self.IMAGE_EXTENT
+        h, w = self.IMAGE_SHAPE
+        ys, xs = np.linspace(y0, y1, h), np.linspace(x0, x1, w)
+        mu = np.stack([np.zeros_like(self.EMITTERS), -self.EMITTERS], axis=1)
+        frame = np.zeros((h, w))
+
+        emim = mn.ImageMobject(np.zeros((h, w, 4), dtype=np.uint8))
+        emim.stretch_to_fit_width(x1-x0).stretch_to_fit_height(y1-y0)
+        emim.move_to([(x0+x1)/2, (y0+y1)/2, 0])
+
+        def emit(im):
+            brightness = gaussian_opacity([p.get_value()], self.EMITTERS, OPACITY, k)[:,0]
+            frame[...] = 0
+            render_emitters(ys, xs, mu, sig, brightness, out=frame)
+            composite([frame[::-1]], [FL_COLOR], out=im.pixel_array)
+
+        emim.add_updater(emit)
+
+        self.add(spotim, emim, fls)
+
+        for target, run_time in segments:
+            self.play(p.animate.set_value(target), run_time=run_time, rate_func=mn.linear)
+        self.wait()
+
+class ScanManyFlConfocal(ScanFluorophores):
+    EMITTERS = np.random.default_rng(0).uniform(-4.5, -1.5, 200)
+
+class ScanManyFlSTED(ScanFluorophores):
+    EMITTERS = np.random.default_rng(0).uniform(-4.5, -1.5, 200)
+    MODALITY = 'sted'
+
+class RasterScan(mn.Scene):
+    """
+    Raster scan a 2D field of fluorophores (left) and build up the simulated,
+    shot-noise limited confocal or STED image (right) line by line.
+    """
+    MODALITY = 'confocal'
+    SATURATION = 12.7  # STED donut peak / I_sat
+    N_EMITTERS = 300
+    SHAPE = (200, 200)
+    PIXEL_SIZE = 0.02
+    SIG = 0.08  # width of the confocal spot, in the units of PIXEL_SIZE
+    PHOTONS = 30  # peak photons of a single fluorophore
+    RUN_TIME = 6
+    SIZE = 5  # on-screen width/height of each image
+
+    def construct(self):
+
+        h, w = self.SHAPE
+        ps = self.PIXEL_SIZE
+        rng = np.random.default_rng(0)
+        sample = emitter_map(rng.uniform(0, [h*ps, w*ps], (self.N_EMITTERS, 2)), self.SHAPE, ps)
+
+        kind = 'sted' if self.MODALITY == 'sted' else 'gauss'
+        kernel = scan_psf(kind, self.SIG, ps, self.SATURATION, pinhole=self.SIG)
+        lines = raster_scan(sample, kernel, block_rows=1, photons=self.PHOTONS, rng=1)
+        image = np.zeros(self.SHAPE, dtype=np.float32)
+        done = [0]
+
+        truthim = mn.ImageMobject(composite([np.minimum(sample, 1)], [FL_COLOR], alpha=True))
+        scanim = mn.ImageMobject(np.zeros((h, w, 4), dtype=np.uint8))
+        for im, x in ((truthim, -3.5), (scanim, 3.5)):
+            im.set_resampling_algorithm(mn.RESAMPLING_ALGORITHMS["nearest"])
+            im.stretch_to_fit_width(self.SIZE).stretch_to_fit_height(self.SIZE)
+            im.set_x(x)
+
+        p = mn.ValueTracker(0)
+        top = truthim.get_top()[1]
+
+        def scan(im):
+            row = min(int(p.get_value()), h)
+            while done[0] < row:
+                r0, l = next(lines)
+                image[r0:r0+l.shape[0]] = l/self.PHOTONS
+                done[0] = r0+l.shape[0]
+            composite([image], [FL_COLOR], out=im.pixel_array)
+
+        scanim.add_updater(scan)
+
+        scanline = mn.Line([-3.5-self.SIZE/2, top, 0], [-3.5+self.SIZE/2, top, 0], color=EX_COLOR)
+        scanline.add_updater(lambda z: z.set_y(top - self.SIZE*p.get_value()/h))
+
+        self.add(truthim, scanim, scanline)
+        self.play(p.animate.set_value(h), run_time=self.RUN_TIME, rate_func=mn.linear)
+        self.wait()
+
+class RasterScanSTED(RasterScan):
+    MODALITY = 'sted'
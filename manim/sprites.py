@@ -0,0 +1,120 @@
+"""
+Sprite atlas of colorized PSF images shared by the scenes.
+
+Each distinct image is computed once per process and stored as a .npy file
+in .sprite_cache/ next to this module, so later renders skip the numerics
+entirely. Cache entries are keyed on the sprite parameters and on the
+source of psf.py, so editing the kernels invalidates them.
+"""
+
+import os
+import hashlib
+import tempfile
+
+import numpy as np
+
+import psf
+from psf import gauss2D, donut2D, composite, sted_survival, to_rgb
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sprite_cache')
+GRID = (-3, 3, 100)  # (start, stop, n) of the np.linspace sprite grid
+
+KERNELS = {'gauss': gauss2D, 'donut': donut2D}
+
+_atlas = {}
+
+def _psf_source_hash():
+    with open(psf.__file__, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+_PSF_HASH = _psf_source_hash()
+
+def _key(layers, grid, mode):
+    return hashlib.sha1(repr((_PSF_HASH, layers, tuple(grid), mode)).encode()).hexdigest()
+
+def _render(layers, grid, mode):
+    x = np.linspace(*grid)
+    arrs = [KERNELS[kind](x, x, a=a, sig=sig, b=b) for kind, sig, a, b, _ in layers]
+    return composite(arrs, [rgb for *_, rgb in layers], mode=mode, alpha=True)
+
+def _lookup(key, use_disk=True):
+    img = _atlas.get(key)
+    if img is None and use_disk:
+        path = os.path.join(CACHE_DIR, f"{key}.npy")
+        if os.path.exists(path):
+            img = np.load(path)
+            img.flags.writeable = False
+            _atlas[key] = img
+    return img
+
+def _store(key, img, use_disk=True):
+    if use_disk:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix='.npy.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, img)
+        os.replace(tmp, os.path.join(CACHE_DIR, f"{key}.npy"))
+
+    img.flags.writeable = False
+    _atlas[key] = img
+    return img
+
+def sprite(layers, grid=GRID, mode='max', use_disk=True):
+    """
+    Return the shared, read-only RGBA sprite for a stack of PSF layers.
+
+    Parameters
+    ----------
+    layers : sequence
+        (kind, sig, a, b, color) per layer, kind being 'gauss' or 'donut'.
+        Layers are composited with psf.composite.
+    grid : tuple
+        (start, stop, n) of the sprite's np.linspace grid.
+    mode : str
+        Compositing mode, see psf.composite.
+    use_disk : bool
+        Read/write the on-disk cache as well as the in-memory one.
+    """
+    layers = tuple((kind, float(sig), float(a), float(b), to_rgb(c)) for kind, sig, a, b, c in layers)
+    key = _key(layers, grid, mode)
+
+    img = _lookup(key, use_disk)
+    if img is None:
+        img = _store(key, _render(layers, grid, mode), use_disk)
+    return img
+
+def psf_sprite(kind='gauss', sig=1, a=1, b=0, color=(1, 1, 1), grid=GRID):
+    """ Colorized gauss2D/donut2D sprite. """
+    return sprite(((kind, sig, a, b, color),), grid=grid)
+
+def sted_sprite(sig, a=1, b=0, ex_color=(1, 1, 0), sted_color=(1, 0, 0), grid=GRID):
+    """ Excitation Gaussian of width sig under a STED donut of amplitude a and offset b. """
+    return sprite((('gauss', sig, 1, 0, ex_color), ('donut', 1, a, b, sted_color)), grid=grid)
+
+def sted_sweep(saturations, sig=1, b=0, ex_color=(1, 1, 0), sted_color=(1, 0, 0), grid=GRID, use_disk=True):
+    """
+    Sprites of the effective STED PSF (ex_color) over the depleted region
+    (sted_color) for each saturation factor, see psf.sted2D. Sprites not
+    cached yet are computed together in one batched call.
+    """
+    ex, st = to_rgb(ex_color), to_rgb(sted_color)
+    keys = [_key((('sted', float(z), float(sig), float(b), ex, st),), grid, 'max') for z in saturations]
+    imgs = [_lookup(k, use_disk) for k in keys]
+
+    missing = [i for i, img in enumerate(imgs) if img is None]
+    if missing:
+        x = np.linspace(*grid)
+        exc = gauss2D(x, x, sig=sig)
+        survival = sted_survival(donut2D(x, x, sig=sig, b=b), [saturations[i] for i in missing])
+        for i, surv in zip(missing, survival):
+            imgs[i] = _store(keys[i], composite([exc*surv, 1-surv], [ex, st], alpha=True), use_disk)
+
+    return imgs
+
+def clear(disk=False):
+    """ Empty the in-memory atlas, and the on-disk cache too if disk is True. """
+    _atlas.clear()
+    if disk and os.path.isdir(CACHE_DIR):
+        for fn in os.listdir(CACHE_DIR):
+            if fn.endswith('.npy'):
+                os.remove(os.path.join(CACHE_DIR, fn))
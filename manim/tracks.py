@@ -0,0 +1,94 @@
+"""
+Precomputed opacity and position tracks for ValueTracker-driven scenes.
+
+Instead of one Python lambda per mobject evaluating exp()/Lorentzians on
+every frame, the opacities and x positions of all mobjects are evaluated
+once, vectorized, on every value the tracker takes along its planned
+trajectory. A single updater then looks up the current column.
+"""
+
+import numpy as np
+
+def linear_trajectory(start, segments, fps):
+    """
+    Tracker values at every frame of consecutive linear animations.
+
+    Parameters
+    ----------
+    start : float
+        Initial tracker value.
+    segments : list
+        (target, run_time) per p.animate.set_value(target) play call.
+        Waits can be given as (current value, run_time).
+    fps : float
+        Frame rate (mn.config.frame_rate).
+    """
+    values = [np.array([start], dtype=float)]
+    for target, run_time in segments:
+        n = max(int(round(run_time*fps)), 1)
+        values.append(np.linspace(start, target, n+1)[1:])
+        start = target
+    return np.concatenate(values)
+
+def gaussian_opacity(p, pos, a=1, k=8):
+    """ a*exp(-k*(p-pos)^2) for every (pos, p) pair, shape (len(pos), len(p)). """
+    d = np.asarray(p)[None,:] - np.atleast_1d(pos)[:,None]
+    return a*np.exp(-k*d*d)
+
+def lorentzian_opacity(p, pos, a=1, gamma=1, cap=None):
+    """ a/(pi*gamma*(1+((p-pos)/gamma)^2)) for every (pos, p) pair, optionally capped. """
+    d = (np.asarray(p)[None,:] - np.atleast_1d(pos)[:,None])/gamma
+    op = a/(np.pi*gamma*(1+d*d))
+    return op if cap is None else np.minimum(op, cap)
+
+class TrackSet:
+    """
+    Opacity/x tracks of many mobjects, indexed by the value of one tracker.
+
+    Parameters
+    ----------
+    tracker : mn.ValueTracker
+        The tracker driving the scene.
+    samples : np.array
+        Tracker values the tracks are evaluated on, usually the output of
+        linear_trajectory. At draw time the tracks are linearly
+        interpolated between the two samples around the tracker value.
+    """
+    def __init__(self, tracker, samples):
+        self.tracker = tracker
+        self.p = np.unique(np.asarray(samples, dtype=float))
+        self._entries = []
+
+    def add(self, mobjects, opacity=None, x=None):
+        """
+        Attach tracks to mobjects. opacity and x are (len(mobjects), len(self.p))
+        arrays (or broadcastable to it), e.g. gaussian_opacity(tracks.p, ...)
+        or tracks.p itself for a mobject that follows the tracker.
+        """
+        shape = (len(mobjects), self.p.size)
+        opacity = None if opacity is None else np.broadcast_to(opacity, shape)
+        x = None if x is None else np.broadcast_to(x, shape)
+        self._entries.append((list(mobjects), opacity, x))
+        return self
+
+    def position(self):
+        """ (i, w): the tracker sits a fraction w of the way from sample i to i+1. """
+        v = self.tracker.get_value()
+        i = int(np.clip(np.searchsorted(self.p, v) - 1, 0, max(self.p.size-2, 0)))
+        if self.p.size < 2:
+            return i, 0.0
+        w = float(np.clip((v - self.p[i])/(self.p[i+1] - self.p[i]), 0, 1))
+        return i, w
+
+    def update(self, _mob=None):
+        """ Updater: apply the current (interpolated) column of every track. """
+        i, w = self.position()
+        j = min(i+1, self.p.size-1)
+        for mobjects, opacity, x in self._entries:
+            op = None if opacity is None else (1-w)*opacity[:, i] + w*opacity[:, j]
+            xs = None if x is None else (1-w)*x[:, i] + w*x[:, j]
+            for k, m in enumerate(mobjects):
+                if op is not None:
+                    m.set_opacity(op[k])
+                if xs is not None:
+                    m.set_x(xs[k])
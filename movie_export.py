@@ -0,0 +1,143 @@
+"""
+Streaming export of image stacks to animated GIF or MP4.
+
+Frames are consumed one at a time from any iterable (an array, a memmap or
+a generator), scaled to uint8 with fixed global bounds and written straight
+to the file, so memory use does not grow with the length of the movie.
+"""
+
+import os
+import shutil
+import itertools
+import subprocess
+
+import numpy as np
+
+def stack_bounds(stack, start=0, stop=None, chunk_size=64):
+    """
+    Global (min, max) of stack[start:stop], read chunk_size frames at a time
+    so memmapped stacks are never loaded whole.
+    """
+    stop = len(stack) if stop is None else stop
+    lo, hi = np.inf, -np.inf
+    for i in range(start, stop, chunk_size):
+        block = np.asarray(stack[i:min(i+chunk_size, stop)])
+        lo, hi = min(lo, block.min()), max(hi, block.max())
+    return float(lo), float(hi)
+
+def scale_frames(frames, lo=None, hi=None):
+    """
+    Yield the frames as uint8, mapping [lo, hi] to [0, 255] and clipping
+    values outside. uint8 frames are passed through if lo and hi are None.
+    """
+    scale = None
+    for frame in frames:
+        frame = np.asarray(frame)
+        if lo is None and hi is None:
+            if frame.dtype != np.uint8:
+                raise ValueError("lo and hi are needed to scale non-uint8 frames, see stack_bounds")
+            yield frame
+            continue
+
+        if scale is None:
+            scale = np.float32(255/(hi-lo)) if hi > lo else np.float32(0)
+        f = np.subtract(frame, lo, dtype=np.float32)
+        f *= scale
+        np.clip(f, 0, 255, out=f)
+        yield f.astype(np.uint8)
+
+def _gif_frame(frame):
+    from PIL import Image
+
+    im = Image.fromarray(frame)
+    return im if im.mode in ('L', 'P') else im.quantize(256)
+
+def write_gif(frames, filename, duration=100, loop=0, lo=None, hi=None):
+    """
+    Write an animated GIF frame by frame.
+
+    Parameters
+    ----------
+    frames : iterable
+        (H, W) grayscale or (H, W, 3) RGB frames.
+    filename : str
+        Output file.
+    duration : float
+        Display time of each frame in ms.
+    loop : int
+        Number of loops, 0 loops forever.
+    lo, hi : float
+        Intensity bounds mapped to 0 and 255, see scale_frames.
+
+    Returns
+    -------
+    int
+        Number of frames written.
+    """
+    from PIL import GifImagePlugin
+
+    n = 0
+    with open(filename, 'wb') as f:
+        for frame in scale_frames(frames, lo, hi):
+            im = _gif_frame(frame)
+            if n == 0:
+                header, _ = GifImagePlugin.getheader(im, None, {'loop': loop, 'duration': duration})
+                f.write(b''.join(header))
+            # quantized RGB frames each carry their own palette
+            f.write(b''.join(GifImagePlugin.getdata(im, duration=duration, include_color_table=im.mode == 'P')))
+            n += 1
+        f.write(b';')  # GIF trailer
+    return n
+
+def write_mp4(frames, filename, fps=24, lo=None, hi=None, codec='libx264', crf=18, ffmpeg=None):
+    """
+    Pipe frames to ffmpeg as they are produced, encoding an MP4 (or any
+    container ffmpeg infers from filename).
+
+    See write_gif for frames, lo and hi. crf is the x264/x265 quality
+    (lower is better) and ffmpeg the executable, found on the PATH by default.
+
+    Returns
+    -------
+    int
+        Number of frames written.
+    """
+    ffmpeg = ffmpeg or shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg was not found on the PATH")
+
+    frames = scale_frames(frames, lo, hi)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError("No frames to write")
+    h, w = first.shape[:2]
+    pix_fmt = 'gray' if first.ndim == 2 else 'rgb24'
+
+    cmd = [ffmpeg, '-y', '-loglevel', 'error',
+           '-f', 'rawvideo', '-pix_fmt', pix_fmt, '-s', f"{w}x{h}", '-r', str(fps), '-i', '-',
+           # yuv420p needs even dimensions
+           '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-c:v', codec, '-crf', str(crf),
+           '-pix_fmt', 'yuv420p', filename]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    n = 0
+    try:
+        for frame in itertools.chain([first], frames):
+            proc.stdin.write(np.ascontiguousarray(frame).tobytes())
+            n += 1
+    finally:
+        proc.stdin.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {proc.returncode}")
+    return n
+
+def export_movie(frames, filename, fps=None, duration=None, lo=None, hi=None, **kwargs):
+    """
+    Stream frames to a .gif (write_gif) or, through ffmpeg, any video format
+    (write_mp4), chosen from the extension of filename. The frame rate is
+    given either as fps or as the per-frame duration in ms.
+    """
+    if fps is None:
+        fps = 1000/duration if duration else 24
+    if os.path.splitext(filename)[1].lower() == '.gif':
+        return write_gif(frames, filename, duration=duration or 1000/fps, lo=lo, hi=hi, **kwargs)
+    return write_mp4(frames, filename, fps=fps, lo=lo, hi=hi, **kwargs)
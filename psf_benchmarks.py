@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark and regression check of the PSF kernels
+
+Times the manim/psf.py kernels (gauss1D, gauss2D, donut1D, donut2D,
+lorentzian1D, colorize) and widefield_psf_2d over grid sizes and dtypes,
+with warm-up and repeated perf_counter samples, and records the peak memory
+of one call with tracemalloc. 1D kernels are evaluated on size^2 points so
+every case covers the same number of samples.
+
+Every run is compared against a baseline run, by default the stored run of
+the nearest ancestor commit, then saved as <results dir>/<git commit>.json
+("-dirty" appended when the tree has local changes; never picked as default
+baseline). Cases already stored for the commit and not re-run are kept, so
+partial runs add to a full one. The exit status is 1 if any case is more
+than --threshold slower than the baseline.
+
+Usage:
+    python psf_benchmarks.py [-k gauss2D donut2D] [-s 256 1024] [-d float32 float64]
+                             [-n 10] [--baseline <commit or file>] [--threshold 0.25]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tracemalloc
+import importlib.util
+
+import numpy as np
+
+from widefield_psf import widefield_psf_2d
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, '.benchmarks')
+SIZES = (256, 1024, 2048)
+DTYPES = ('float32', 'float64')
+
+def _load_manim_psf():
+    # manim/psf.py is a script-side module, load it by path rather than as a package
+    spec = importlib.util.spec_from_file_location('manim_psf', os.path.join(HERE, 'manim', 'psf.py'))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+psf = _load_manim_psf()
+
+def _cases():
+    # kernel name -> setup(size, dtype) returning the zero-argument call to time
+    def grid(n, dtype):
+        return np.linspace(-3, 3, n, dtype=dtype)
+
+    def complex_dtype(dtype):
+        return np.complex64 if np.dtype(dtype) == np.float32 else np.complex128
+
+    return {
+        'gauss1D': lambda n, dt: (lambda x=grid(n*n, dt): psf.gauss1D(x, dtype=dt)),
+        'donut1D': lambda n, dt: (lambda x=grid(n*n, dt): psf.donut1D(x, dtype=dt)),
+        'lorentzian1D': lambda n, dt: (lambda x=grid(n*n, dt): psf.lorentzian1D(x, dtype=dt)),
+        'gauss2D': lambda n, dt: (lambda x=grid(n, dt): psf.gauss2D(x, x, dtype=dt)),
+        'donut2D': lambda n, dt: (lambda x=grid(n, dt): psf.donut2D(x, x, dtype=dt)),
+        'colorize': lambda n, dt: (lambda a=psf.gauss2D(grid(n, dt), grid(n, dt), dtype=dt):
+                                   psf.colorize(a, c=(1, 0.5, 0))),
+        'widefield_psf_2d': lambda n, dt: (lambda: widefield_psf_2d(0.6, 1.4, 1.515, 0.05, n,
+                                                                    dtype=complex_dtype(dt))),
+    }
+
+CASES = _cases()
+
+def benchmark_case(kernel, size, dtype, repeats=10, warmup=1):
+    """
+    Time one kernel at one grid size and dtype.
+
+    Returns
+    -------
+    dict
+        min/median/mean/std of the call time (s) and the tracemalloc peak (bytes)
+        of a single call.
+    """
+    call = CASES[kernel](size, dtype)
+    for _ in range(warmup):
+        call()
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+
+    # separately, tracemalloc slows the calls down
+    tracemalloc.start()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    t = np.asarray(times)
+    return {'min': float(t.min()), 'median': float(np.median(t)), 'mean': float(t.mean()),
+            'std': float(t.std(ddof=1)) if t.size > 1 else 0.0, 'peak_bytes': int(peak)}
+
+def run(kernels, sizes=SIZES, dtypes=DTYPES, repeats=10, warmup=1, verbose=True):
+    results = []
+    for kernel in kernels:
+        for size in sizes:
+            for dtype in dtypes:
+                row = {'kernel': kernel, 'size': size, 'dtype': dtype, 'repeats': repeats}
+                row.update(benchmark_case(kernel, size, dtype, repeats, warmup))
+                results.append(row)
+                if verbose:
+                    print(f"{kernel:>16} {size:>5} {dtype:>7}  {1e3*row['median']:9.3f} ms "
+                          f"+/- {1e3*row['std']:.3f}  peak {row['peak_bytes']/2**20:8.1f} MiB")
+    return results
+
+def _git(*args):
+    return subprocess.run(['git', *args], cwd=HERE, capture_output=True, text=True).stdout.strip()
+
+def git_commit():
+    """ Short hash of HEAD, with '-dirty' if tracked files have local changes. """
+    commit = _git('rev-parse', '--short', 'HEAD') or 'unknown'
+    return commit + ('-dirty' if _git('status', '--porcelain', '--untracked-files=no') else '')
+
+def environment():
+    return {'python': sys.version.split()[0], 'platform': platform.platform(),
+            'numpy': np.__version__, 'cpus': os.cpu_count()}
+
+def _key(row):
+    return row['kernel'], row['size'], row['dtype']
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+def save_results(results, commit, results_dir=RESULTS_DIR):
+    """
+    Store results as results_dir/<commit>.json, replacing the cases that
+    were re-run and keeping the other ones already stored for commit.
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    filename = os.path.join(results_dir, f"{commit}.json")
+    if os.path.exists(filename):
+        new = {_key(row) for row in results}
+        results = [row for row in load_results(filename)['results'] if _key(row) not in new] + results
+    with open(filename, 'w') as f:
+        json.dump({'commit': commit, 'time': time.time(), 'environment': environment(),
+                   'results': results}, f, indent=1)
+    return filename
+
+def find_baseline(baseline=None, commit=None, results_dir=RESULTS_DIR):
+    """
+    Path of the results to compare against, None if there are none.
+
+    baseline is a results file or a git revision with a run in results_dir.
+    By default it is the run of the nearest ancestor of HEAD (commit itself
+    excluded) in results_dir; runs of dirty trees are never picked.
+    """
+    if baseline is not None:
+        paths = [baseline, os.path.join(results_dir, f"{baseline}.json")]
+        short = _git('rev-parse', '--verify', '--quiet', '--short', baseline)
+        if short:
+            paths.append(os.path.join(results_dir, f"{short}.json"))
+        return next((path for path in paths if os.path.isfile(path)), None)
+
+    if not os.path.isdir(results_dir):
+        return None
+    runs = {f[:-len('.json')] for f in os.listdir(results_dir)
+            if f.endswith('.json') and not f.endswith('-dirty.json')} - {commit}
+    for ancestor in _git('rev-list', 'HEAD').split():
+        for run_commit in runs:
+            if ancestor.startswith(run_commit):
+                return os.path.join(results_dir, f"{run_commit}.json")
+    return None
+
+def compare(results, baseline, threshold=0.25):
+    """
+    Cases whose median time grew by more than threshold (relative) over the
+    baseline, as (row, baseline row, ratio) tuples.
+    """
+    base = {_key(r): r for r in baseline['results']}
+    regressions = []
+    for row in results:
+        old = base.get(_key(row))
+        if old is not None and old['median'] > 0:
+            ratio = row['median']/old['median']
+            if ratio > 1 + threshold:
+                regressions.append((row, old, ratio))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', '--kernels', nargs='+', default=list(CASES), choices=list(CASES))
+    parser.add_argument('-s', '--sizes', nargs='+', type=int, default=list(SIZES))
+    parser.add_argument('-d', '--dtypes', nargs='+', default=list(DTYPES), choices=DTYPES)
+    parser.add_argument('-n', '--repeats', type=int, default=10, help="Timed calls per case")
+    parser.add_argument('-w', '--warmup', type=int, default=1, help="Untimed calls per case")
+    parser.add_argument('--results-dir', default=RESULTS_DIR)
+    parser.add_argument('--baseline', help="Commit or results file to compare against "
+                                           "(default: run of the nearest ancestor commit)")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed relative slowdown of the median time")
+    parser.add_argument('--no-save', action='store_true', help="Don't store this run")
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    baseline_path = find_baseline(args.baseline, commit, args.results_dir)
+    if args.baseline is not None and baseline_path is None:
+        parser.error(f"--baseline: no results file or stored run for '{args.baseline}'")
+
+    results = run(args.kernels, args.sizes, args.dtypes, args.repeats, args.warmup)
+
+    # compare before saving, a run of this commit may itself be the baseline
+    regressions = []
+    if baseline_path is None:
+        print("No baseline to compare against")
+    else:
+        baseline = load_results(baseline_path)
+        regressions = compare(results, baseline, args.threshold)
+        for row, old, ratio in regressions:
+            print(f"REGRESSION {row['kernel']} {row['size']} {row['dtype']}: {1e3*old['median']:.3f} ms "
+                  f"({baseline['commit']}) -> {1e3*row['median']:.3f} ms ({commit}), x{ratio:.2f}")
+        print(f"{len(regressions)} of {len(results)} cases slower than x{1+args.threshold:.2f} "
+              f"vs {baseline['commit']}")
+
+    if not args.no_save:
+        print(f"Saved {save_results(results, commit, args.results_dir)}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Memoize widefield PSFs on their optical parameters.
+
+Entries live in a byte-limited in-memory LRU and, optionally, as .npy files
+in a cache directory so they survive kernel restarts.
+"""
+
+import os
+import hashlib
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from widefield_psf import widefield_psf_3d, _roi_indices
+
+def make_key(*params):
+    """ Hash a tuple of (scalar or array) parameters into a hex string. """
+    h = hashlib.sha1()
+    for p in params:
+        if isinstance(p, np.ndarray) or isinstance(p, (list, tuple)):
+            p = np.ascontiguousarray(p, dtype=float)
+            h.update(str(p.shape).encode())
+            h.update(p.tobytes())
+        else:
+            h.update(repr(float(p) if isinstance(p, (int, float, np.number)) else p).encode())
+        h.update(b'|')
+    return h.hexdigest()
+
+class PSFCache:
+    """
+    Byte-limited LRU of numpy arrays with optional on-disk persistence.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Upper bound on the summed nbytes of arrays held in memory.
+    cache_dir : str
+        Directory for persistent .npy entries. None keeps the cache in
+        memory only.
+    """
+    def __init__(self, max_bytes=2**30, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self._entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        path = self._path(key)
+        return key in self._entries or (path is not None and os.path.exists(path))
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'evictions': self.evictions, 'entries': len(self), 'nbytes': self.nbytes}
+
+    def _path(self, key):
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _remember(self, key, arr):
+        if arr.nbytes > self.max_bytes:
+            return
+        self._entries[key] = arr
+        self.nbytes += arr.nbytes
+        while self.nbytes > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self.nbytes -= old.nbytes
+            self.evictions += 1
+
+    def get(self, key):
+        """ Return the cached array for key, or None. """
+        arr = self._entries.get(key)
+        if arr is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return arr
+
+        path = self._path(key)
+        if path is not None and os.path.exists(path):
+            arr = np.load(path)
+            arr.flags.writeable = False
+            self._remember(key, arr)
+            self.disk_hits += 1
+            return arr
+
+        self.misses += 1
+        return None
+
+    def put(self, key, arr):
+        """ Store a read-only copy of arr under key and return it. """
+        # a private copy: the caller's array stays writeable and later
+        # writes to it cannot reach the cached entry
+        arr = np.array(arr, copy=True)
+        arr.flags.writeable = False
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key).nbytes
+        self._remember(key, arr)
+
+        path = self._path(key)
+        if path is not None and not os.path.exists(path):
+            # write then rename so an interrupted save never leaves a truncated entry
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.npy.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, arr)
+            os.replace(tmp, path)
+
+        return arr
+
+    def get_or_compute(self, key, fn, *args, **kwargs):
+        """ Return the cached array for key, computing it with fn(*args, **kwargs) on a miss. """
+        arr = self.get(key)
+        if arr is None:
+            arr = self.put(key, fn(*args, **kwargs))
+        return arr
+
+    def clear(self, disk=False):
+        """ Drop the in-memory entries, and the .npy files too if disk is True. """
+        self._entries.clear()
+        self.nbytes = 0
+        if disk and self.cache_dir is not None:
+            for fn in os.listdir(self.cache_dir):
+                if fn.endswith('.npy'):
+                    os.remove(os.path.join(self.cache_dir, fn))
+
+_default_cache = PSFCache()
+
+def get_default_cache():
+    return _default_cache
+
+def set_default_cache(max_bytes=2**30, cache_dir=None):
+    """ Replace the module-level cache used by the cached_* functions. """
+    global _default_cache
+    _default_cache = PSFCache(max_bytes=max_bytes, cache_dir=cache_dir)
+    return _default_cache
+
+def _roi_key(roi, chip_size):
+    # slices and index arrays selecting the same pixels share a key
+    if roi is None:
+        return (None, None)
+    return _roi_indices(roi, chip_size)
+
+def cached_widefield_psf_3d(wvl, NA, n, pixel_size, chip_size, z_array, roi=None, dtype=np.complex128,
+                            cache=None):
+    """
+    Memoized widefield_psf_3d. See widefield_psf.widefield_psf_3d.
+
+    The returned array is shared with the cache and is read-only.
+    """
+    cache = _default_cache if cache is None else cache
+    z = np.asarray(z_array, dtype=float).ravel()
+    key = make_key('widefield_psf_3d', wvl, NA, n, pixel_size, chip_size, z,
+                   *_roi_key(roi, chip_size), np.dtype(dtype).str)
+    return cache.get_or_compute(key, widefield_psf_3d, wvl, NA, n, pixel_size, chip_size, z,
+                                roi=roi, dtype=dtype)
+
+def cached_widefield_psf_2d(wvl, NA, n, pixel_size, chip_size, z=0.0, roi=None, dtype=np.complex128,
+                            cache=None):
+    """
+    Memoized widefield_psf_2d. See widefield_psf.widefield_psf_2d.
+
+    The returned array is shared with the cache and is read-only.
+    """
+    return cached_widefield_psf_3d(wvl, NA, n, pixel_size, chip_size, [z], roi=roi, dtype=dtype,
+                                   cache=cache)[0]
@@ -0,0 +1,116 @@
+"""
+Out-of-core widefield PSF stacks.
+
+Stacks are written a few z-planes at a time into .npy files opened as
+memory maps, so peak memory is a handful of planes regardless of depth.
+"""
+
+import numpy as np
+
+import fft_backend as fb
+from widefield_psf import widefield_psf_3d, intensity_psf
+
+def widefield_psf_3d_to_file(wvl, NA, n, pixel_size, chip_size, z_array, filename,
+                             dtype=np.complex64, intensity=False, chunk_size=8):
+    """
+    Stream a widefield PSF stack to disk, chunk_size z-planes at a time.
+
+    Parameters
+    ----------
+    wvl, NA, n, pixel_size, chip_size, z_array
+        See widefield_psf.widefield_psf_3d.
+    filename : str
+        Path of the .npy file to write.
+    dtype : np.dtype
+        Storage type of the electric field (complex64 or complex128). Ignored
+        if intensity is True.
+    intensity : bool
+        Store the intensity PSF as float32 instead of the electric field.
+    chunk_size : int
+        Number of z-planes computed per batched FFT.
+
+    Returns
+    -------
+    stack : np.memmap
+        Read-only (len(z_array), chip_size, chip_size) view of the file.
+    """
+    z = np.asarray(z_array, dtype=float).ravel()
+    out_dtype = np.float32 if intensity else np.dtype(dtype)
+    stack = np.lib.format.open_memmap(filename, mode='w+', dtype=out_dtype,
+                                      shape=(len(z), chip_size, chip_size))
+
+    for start in range(0, len(z), chunk_size):
+        psf = widefield_psf_3d(wvl, NA, n, pixel_size, chip_size, z[start:start+chunk_size],
+                               dtype=np.complex64 if intensity else out_dtype)
+        if intensity:
+            psf = intensity_psf(psf)
+        stack[start:start+len(psf)] = psf
+    stack.flush()
+    del stack
+
+    return open_psf_stack(filename)
+
+def open_psf_stack(filename, mode='r'):
+    """ Open a PSF stack written by widefield_psf_3d_to_file as a memory map. """
+    return np.load(filename, mmap_mode=mode)
+
+def iter_chunks(stack, chunk_size=8, axis=0):
+    """
+    Lazily yield (start, block) pairs of chunk_size planes along axis.
+
+    Each block is loaded into memory as an ndarray; the rest of the stack
+    stays on disk.
+    """
+    for start in range(0, stack.shape[axis], chunk_size):
+        sl = [slice(None)]*stack.ndim
+        sl[axis] = slice(start, start+chunk_size)
+        yield start, np.array(stack[tuple(sl)])
+
+def otf_3d(stack, filename=None, dtype=np.complex64, chunk_size=8, block_size=8):
+    """
+    3D OTF of a PSF stack, computed out-of-core in separable passes.
+
+    Pass one takes a 2D FFT of the intensity of each z-plane, chunk_size
+    planes at a time. Pass two takes a 1D FFT along z over blocks of
+    block_size rows. Only one chunk or block is held in memory at once. The
+    result equals np.fft.fftn(intensity_psf(stack)) (unshifted).
+
+    Parameters
+    ----------
+    stack : np.array or np.memmap
+        (n_z, ny, nx) PSF stack. Complex stacks are treated as electric field
+        and converted with intensity_psf; real stacks are taken as intensity.
+    filename : str
+        Path of the .npy file to write the OTF into. None returns an
+        in-memory array.
+    dtype : np.dtype
+        Complex type of the output.
+    chunk_size : int
+        Number of z-planes per 2D FFT pass.
+    block_size : int
+        Number of y rows per 1D FFT pass along z.
+
+    Returns
+    -------
+    otf : np.array or np.memmap
+        (n_z, ny, nx) complex OTF.
+    """
+    if filename is None:
+        otf = np.empty(stack.shape, dtype=dtype)
+    else:
+        otf = np.lib.format.open_memmap(filename, mode='w+', dtype=dtype, shape=stack.shape)
+
+    for start, block in iter_chunks(stack, chunk_size, axis=0):
+        if np.iscomplexobj(block):
+            block = intensity_psf(block)
+        otf[start:start+len(block)] = fb.fft2(block, axes=(-2,-1))
+
+    for start, block in iter_chunks(otf, block_size, axis=1):
+        otf[:, start:start+block.shape[1], :] = fb.fft(block, axis=0)
+
+    if filename is not None:
+        otf.flush()
+        del otf
+        return open_psf_stack(filename)
+
+    return otf
@@ -0,0 +1,151 @@
+"""
+Fluorophore blinking and photon statistics for simulated SMLM data.
+
+Each emitter follows a discrete-time Markov chain over frames with an off
+(dark), an on and a bleached state. Instead of stepping through every frame,
+the chain is simulated through its geometrically distributed dwell times:
+every round draws the next on burst of all emitters still alive at once.
+The result is a sparse list of bursts (or localizations), never an
+(n_emitters, n_frames) array.
+"""
+
+import numpy as np
+
+BURST_DTYPE = np.dtype([('emitter', np.int64), ('start', np.int64), ('length', np.int64)])
+LOCALIZATION_DTYPE = np.dtype([('emitter', np.int64), ('frame', np.int64), ('photons', np.float32)])
+
+def _geometric(rng, p, size):
+    # Dwell times (>= 1 frame) with per-frame exit probability p, infinite if p == 0
+    if p <= 0:
+        return np.full(size, np.iinfo(np.int64).max//2, dtype=np.int64)
+    return rng.geometric(min(p, 1), size).astype(np.int64)
+
+def simulate_bursts(n_emitters, n_frames, p_on, p_off, p_bleach=0.0, start_on=0.0, rng=None):
+    """
+    On bursts of all emitters, from their off/on/bleach Markov chains.
+
+    Parameters
+    ----------
+    n_emitters, n_frames : int
+        Number of emitters and length of the acquisition.
+    p_on : float
+        Per-frame probability of an off emitter switching on.
+    p_off : float
+        Per-frame probability of an on emitter switching off.
+    p_bleach : float
+        Per-frame probability of an on emitter bleaching for good.
+    start_on : float
+        Fraction of emitters that are on in the first frame.
+    rng : np.random.Generator or seed
+
+    Returns
+    -------
+    np.array
+        BURST_DTYPE records (emitter, start frame, length in frames), one per
+        on period, truncated at n_frames. Sorted by round, not by frame.
+    """
+    rng = np.random.default_rng(rng)
+    p_exit = p_off + p_bleach
+
+    idx = np.arange(n_emitters, dtype=np.int64)
+    t = np.where(rng.random(n_emitters) < start_on, 0, _geometric(rng, p_on, n_emitters))
+
+    bursts = []
+    while True:
+        keep = t < n_frames
+        idx, t = idx[keep], t[keep]
+        if idx.size == 0:
+            break
+
+        d = _geometric(rng, p_exit, idx.size)
+        b = np.empty(idx.size, dtype=BURST_DTYPE)
+        b['emitter'], b['start'], b['length'] = idx, t, np.minimum(d, n_frames-t)
+        bursts.append(b)
+
+        # leaving the on state bleaches with probability p_bleach/p_exit,
+        # otherwise the emitter spends a geometric dwell time off
+        alive = rng.random(idx.size) >= (p_bleach/p_exit if p_exit > 0 else 0)
+        idx, t = idx[alive], t[alive] + d[alive]
+        t += _geometric(rng, p_on, idx.size)
+
+    return np.concatenate(bursts) if bursts else np.empty(0, dtype=BURST_DTYPE)
+
+def expand_bursts(bursts):
+    """ (emitter, frame) of every on frame of the bursts, as two (n,) arrays. """
+    lengths = bursts['length']
+    emitter = np.repeat(bursts['emitter'], lengths)
+    # frame = burst start + position within the burst
+    offsets = np.arange(emitter.size) - np.repeat(np.cumsum(lengths)-lengths, lengths)
+    return emitter, np.repeat(bursts['start'], lengths) + offsets
+
+def draw_photons(n, mean=100, dist='exponential', min_photons=0, rng=None):
+    """
+    n photon counts of detected emitters, conditioned on exceeding min_photons.
+
+    dist is 'exponential' (on time spread over the frame, mean photons at
+    full frame) or 'poisson' (constant brightness). For exponential counts
+    the condition is exact through memorylessness, min_photons + Exp(mean).
+    """
+    rng = np.random.default_rng(rng)
+    if dist == 'exponential':
+        return min_photons + rng.exponential(mean, n)
+    elif dist == 'poisson':
+        out = rng.poisson(mean, n).astype(float)
+        low = out <= min_photons
+        while np.any(low):
+            out[low] = rng.poisson(mean, low.sum())
+            low = out <= min_photons
+        return out
+    raise ValueError(f"Unknown photon distribution '{dist}', expected 'exponential' or 'poisson'")
+
+def simulate_blinking(n_emitters, n_frames, p_on, p_off, p_bleach=0.0, photons=100,
+                      dist='exponential', min_photons=0, start_on=0.0, rng=None):
+    """
+    Localizations of blinking emitters with per-frame photon counts.
+
+    The kinetics are those of simulate_bursts. Every on frame emits a photon
+    count drawn from dist ('exponential' or 'poisson') with the given mean,
+    and frames with no more than min_photons photons go undetected.
+
+    Returns
+    -------
+    np.array
+        LOCALIZATION_DTYPE records (emitter, frame, photons), sorted by frame.
+    """
+    rng = np.random.default_rng(rng)
+    emitter, frame = expand_bursts(simulate_bursts(n_emitters, n_frames, p_on, p_off,
+                                                   p_bleach, start_on, rng))
+    if dist == 'exponential':
+        ph = rng.exponential(photons, emitter.size)
+    elif dist == 'poisson':
+        ph = rng.poisson(photons, emitter.size)
+    else:
+        raise ValueError(f"Unknown photon distribution '{dist}', expected 'exponential' or 'poisson'")
+
+    detected = ph > min_photons
+    key = frame[detected]
+    if n_frames <= np.iinfo(np.uint16).max:
+        key = key.astype(np.uint16)  # stable sort of 16 bit keys is a radix sort
+    order = np.argsort(key, kind='stable')
+    locs = np.empty(order.size, dtype=LOCALIZATION_DTYPE)
+    locs['emitter'] = emitter[detected][order]
+    locs['frame'] = frame[detected][order]
+    locs['photons'] = ph[detected][order]
+    return locs
+
+def localization_precision(photons, psf_sigma, pixel_size=None, background=0):
+    """
+    Localization precision of a Gaussian spot (Thompson et al. 2002),
+
+        sigma^2 = (s^2 + a^2/12)/N + 8 pi s^4 b^2/(a^2 N^2)
+
+    with s the PSF standard deviation, a the camera pixel size, N the photon
+    count and b the background noise (photons per pixel). Without pixel_size
+    this reduces to s/sqrt(N).
+    """
+    N = np.asarray(photons, dtype=float)
+    s2 = psf_sigma**2
+    if pixel_size is None:
+        return np.sqrt(s2/N)
+    a2 = pixel_size**2
+    return np.sqrt((s2 + a2/12)/N + 8*np.pi*s2*s2*background**2/(a2*N*N))
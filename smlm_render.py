@@ -0,0 +1,297 @@
+"""
+Rendering of single-molecule localization microscopy (SMLM) movies.
+
+Every localization is drawn as a Gaussian truncated to a small window
+around it, and all windows of a movie are scatter-added (splat.splat) into
+one (T, H, W) stack in a single batched pass. Frames are processed in
+blocks, which bounds the temporary memory and can be spread over threads.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from splat import splat
+
+try:
+    from scipy.ndimage import correlate1d
+except ImportError:
+    correlate1d = None
+
+def frame_shape(bounds, pixel_size):
+    """ (H, W) of frames covering bounds = (x0, y0, x1, y1) with square pixels. """
+    x0, y0, x1, y1 = bounds
+    return int(np.ceil((x1-x0)/pixel_size)), int(np.ceil((y1-y0)/pixel_size))
+
+def render_movie(x, y, sigma, frames, bounds, pixel_size, n_frames=None, amplitude=1,
+                 normalize=True, min_sigma=None, n_sigma=3, dtype=np.float32, out=None,
+                 block_pixels=2**20, chunk_size=2**16, n_jobs=1):
+    """
+    Render SMLM localizations into a stack of frames.
+
+    Parameters
+    ----------
+    x, y : np.array
+        (K,) localization coordinates along the first and second image axes,
+        in the units of bounds and pixel_size (e.g. nm).
+    sigma : float or np.array
+        Gaussian width of each localization (its localization precision).
+    frames : np.array
+        (K,) frame index of each localization.
+    bounds : tuple
+        (x0, y0, x1, y1) of the rendered field of view. Pixel (i, j) is
+        centered on (x0 + i*pixel_size, y0 + j*pixel_size).
+    pixel_size : float
+        Rendered pixel size.
+    n_frames : int
+        Number of frames, defaults to max(frames)+1.
+    amplitude : float or np.array
+        Weight of each localization, e.g. its photon count.
+    normalize : bool
+        Scale each Gaussian to integrate to amplitude (as opposed to peak at
+        amplitude).
+    min_sigma : float
+        Lower bound on sigma, defaults to pixel_size so that no localization
+        falls between pixels.
+    n_sigma : float
+        Footprints are truncated at +/- n_sigma*sigma.
+    dtype : np.dtype
+        Precision of the stack.
+    out : np.array
+        Optional (n_frames, H, W) array to accumulate into, e.g. a memmap.
+    block_pixels : int
+        Approximate number of pixels rendered per frame block.
+    chunk_size : int
+        Localizations evaluated per batch within a block.
+    n_jobs : int
+        Number of threads rendering frame blocks, -1 for all CPUs.
+
+    Returns
+    -------
+    np.array
+        (n_frames, H, W) stack, see frame_shape.
+    """
+    x, y = np.asarray(x, dtype=float).ravel(), np.asarray(y, dtype=float).ravel()
+    K = x.size
+    frames = np.broadcast_to(np.asarray(frames, dtype=np.intp), (K,))
+    sigma = np.maximum(np.broadcast_to(np.asarray(sigma, dtype=float), (K,)),
+                       pixel_size if min_sigma is None else min_sigma)
+    amp = np.broadcast_to(np.asarray(amplitude, dtype=float), (K,))
+    if normalize:
+        amp = amp*pixel_size**2/(2*np.pi*sigma*sigma)
+
+    if n_frames is None:
+        n_frames = int(frames.max(initial=-1)) + 1
+    shape = frame_shape(bounds, pixel_size)
+    if out is None:
+        out = np.zeros((n_frames,) + shape, dtype=dtype)
+
+    # group localizations by frame, then by block of frames
+    keep = (frames >= 0) & (frames < n_frames)
+    order = np.argsort(frames[keep], kind='stable')
+    x, y, sigma, amp, frames = (a[keep][order] for a in (x, y, sigma, amp, frames))
+    fpb = max(block_pixels//(shape[0]*shape[1]), 1)
+    starts = np.arange(0, n_frames, fpb)
+    edges = np.searchsorted(frames, np.append(starts, n_frames))
+    gx = bounds[0] + np.arange(shape[0])*pixel_size
+    gy = bounds[1] + np.arange(shape[1])*pixel_size
+
+    def render(b):
+        # each block is accumulated in float64, then added to out
+        f0, f1 = starts[b], min(starts[b]+fpb, n_frames)
+        sl = slice(edges[b], edges[b+1])
+        if sl.start == sl.stop:
+            return
+        block = np.zeros((f1-f0,) + shape)
+        out[f0:f1] += splat(block, gx, gy, x[sl], y[sl], sigma[sl], amp[sl], frames[sl]-f0,
+                            n_sigma=n_sigma, chunk_size=chunk_size)
+
+    # blocks write disjoint frames, so they can run concurrently
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+    if n_jobs > 1:
+        with ThreadPoolExecutor(n_jobs) as pool:
+            list(pool.map(render, range(starts.size)))
+    else:
+        for b in range(starts.size):
+            render(b)
+
+    return out
+
+def _pixel_index(x, y, bounds, pixel_size, shape):
+    # Flat index of the pixel (nearest center) of every localization, -1 outside
+    i = np.floor((x-bounds[0])/pixel_size + 0.5).astype(np.intp)
+    j = np.floor((y-bounds[1])/pixel_size + 0.5).astype(np.intp)
+    inside = (i >= 0) & (i < shape[0]) & (j >= 0) & (j < shape[1])
+    return np.where(inside, i*shape[1] + j, -1)
+
+def render_histogram(x, y, bounds, pixel_size, weights=None, density=False, chunk_size=2**22):
+    """
+    Histogram of localizations, binned with np.bincount.
+
+    Parameters
+    ----------
+    x, y, bounds, pixel_size
+        See render_movie; pixel (i, j) collects the localizations nearest to
+        (x0 + i*pixel_size, y0 + j*pixel_size).
+    weights : np.array
+        Optional per-localization weight, e.g. photon counts.
+    density : bool
+        Divide by the pixel area, giving localizations per unit area.
+    chunk_size : int
+        Localizations binned per batch, bounds temporary memory.
+
+    Returns
+    -------
+    np.array
+        (H, W) float64 image, see frame_shape.
+    """
+    x, y = np.asarray(x, dtype=float).ravel(), np.asarray(y, dtype=float).ravel()
+    shape = frame_shape(bounds, pixel_size)
+    img = np.zeros(shape[0]*shape[1])
+    for start in range(0, x.size, chunk_size):
+        sl = slice(start, start+chunk_size)
+        idx = _pixel_index(x[sl], y[sl], bounds, pixel_size, shape)
+        keep = idx >= 0
+        w = None if weights is None else np.broadcast_to(weights, x.shape)[sl][keep]
+        img += np.bincount(idx[keep], weights=w, minlength=img.size)
+    img = img.reshape(shape)
+    return img/pixel_size**2 if density else img
+
+def _gauss_kernel(sigma, n_sigma):
+    # Normalized 1D Gaussian of width sigma (pixels), truncated at n_sigma*sigma
+    r = max(int(np.ceil(n_sigma*sigma)), 1)
+    k = np.exp(-np.arange(-r, r+1)**2/(2*sigma*sigma))
+    return k/k.sum()
+
+def _blur(img, kernel):
+    # Separable same-size convolution with a short symmetric 1D kernel, zero padded
+    if correlate1d is not None:
+        for axis in (0, 1):
+            img = correlate1d(img, kernel, axis=axis, mode='constant')
+        return img
+
+    r = kernel.size//2
+    for axis in (0, 1):
+        src = np.moveaxis(img, axis, 0)
+        out = np.zeros_like(img)
+        dst = np.moveaxis(out, axis, 0)
+        n = src.shape[0]
+        for o, w in zip(range(-r, r+1), kernel.astype(img.dtype)):
+            # dst[i] += w*src[i-o]
+            lo, hi = max(o, 0), min(n+o, n)
+            if lo < hi:
+                dst[lo:hi] += w*src[lo-o:hi-o]
+        img = out
+    return img
+
+def render_gaussian(x, y, sigma, bounds, pixel_size, weights=None, density=False,
+                    sigma_step=1.25, n_sigma=3, min_sigma=None, chunk_size=2**22):
+    """
+    Super-resolution image with every localization drawn as a normalized
+    Gaussian of its own width.
+
+    Localizations are grouped into geometric sigma bins (ratio sigma_step
+    between bins). Each bin is histogrammed (render_histogram) and blurred
+    once with the precomputed separable Gaussian of the bin's width, so the
+    cost is set by the image size and number of bins, not by the number of
+    localizations. Positions are snapped to pixel centers, so use a pixel
+    size below the typical sigma.
+
+    Parameters
+    ----------
+    x, y, bounds, pixel_size, weights, density, chunk_size
+        See render_histogram.
+    sigma : float or np.array
+        Localization precision, same units as x and y.
+    sigma_step : float
+        Ratio between neighbouring sigma bins. Each bin is rendered at the rms
+        width of its localizations.
+    n_sigma : float
+        Kernels are truncated at +/- n_sigma*sigma.
+    min_sigma : float
+        Lower bound on sigma, defaults to pixel_size as in render_movie.
+
+    Returns
+    -------
+    np.array
+        (H, W) float32 image.
+    """
+    x, y = np.asarray(x, dtype=float).ravel(), np.asarray(y, dtype=float).ravel()
+    sigma = np.maximum(np.broadcast_to(np.asarray(sigma, dtype=float), x.shape),
+                       pixel_size if min_sigma is None else min_sigma)
+    if weights is not None:
+        weights = np.broadcast_to(np.asarray(weights, dtype=float), x.shape)
+
+    # geometric sigma bins
+    lo = sigma.min(initial=pixel_size)
+    b = np.floor(np.log(sigma/lo)/np.log(sigma_step)).astype(np.intp)
+    order = np.argsort(b, kind='stable')
+    edges = np.searchsorted(b[order], np.arange(b.max(initial=0)+2))
+
+    img = np.zeros(frame_shape(bounds, pixel_size), dtype=np.float32)
+    for k in range(edges.size-1):
+        sel = order[edges[k]:edges[k+1]]
+        if sel.size == 0:
+            continue
+        hist = render_histogram(x[sel], y[sel], bounds, pixel_size,
+                                None if weights is None else weights[sel], chunk_size=chunk_size)
+        # rms width of the bin
+        s = np.sqrt(np.mean(sigma[sel]**2))/pixel_size
+        img += _blur(hist.astype(np.float32), _gauss_kernel(s, n_sigma))
+    return img/np.float32(pixel_size**2) if density else img
+
+def render_triangulation(x, y, bounds, pixel_size, n_jitter=10, jitter=None, rng=None):
+    """
+    Jittered triangulation density (as in PYME's rendJitTri).
+
+    The localizations are Delaunay triangulated n_jitter times after
+    jittering them by jitter (default: the pixel size). Every pixel takes
+    the density 1/(2 * area) of the triangle containing its center (a
+    Delaunay triangulation of N points has about 2N triangles), and the
+    jitters are averaged. Needs scipy; the triangulation makes this the
+    slowest mode, meant for up to ~10^6 localizations.
+
+    Returns
+    -------
+    np.array
+        (H, W) localizations per unit area.
+    """
+    from scipy.spatial import Delaunay
+
+    rng = np.random.default_rng(rng)
+    x, y = np.asarray(x, dtype=float).ravel(), np.asarray(y, dtype=float).ravel()
+    jitter = pixel_size if jitter is None else jitter
+    shape = frame_shape(bounds, pixel_size)
+    gx = bounds[0] + np.arange(shape[0])*pixel_size
+    gy = bounds[1] + np.arange(shape[1])*pixel_size
+    centers = np.stack(np.meshgrid(gx, gy, indexing='ij'), axis=-1).reshape(-1, 2)
+
+    img = np.zeros(shape[0]*shape[1])
+    for _ in range(n_jitter):
+        pts = np.stack([x, y], axis=1) + jitter*rng.standard_normal((x.size, 2))
+        tri = Delaunay(pts)
+        v = pts[tri.simplices]
+        area = 0.5*np.abs((v[:,1,0]-v[:,0,0])*(v[:,2,1]-v[:,0,1]) - (v[:,2,0]-v[:,0,0])*(v[:,1,1]-v[:,0,1]))
+        dens = np.append(1/(2*np.maximum(area, 1e-12)), 0)  # simplex -1 (outside) -> 0
+        img += dens[tri.find_simplex(centers)]
+    return (img/n_jitter).reshape(shape)
+
+def sample_mask(mask, points_per_pixel=0.5, pixel_size=1, rng=None):
+    """
+    Random ground-truth points on the nonzero pixels of a mask (as PYME's
+    locify), weighted by the mask values.
+
+    Returns
+    -------
+    x, y : np.array
+        Point coordinates along the first and second axis of mask, in units
+        of pixel_size.
+    """
+    rng = np.random.default_rng(rng)
+    mask = np.asarray(mask, dtype=float)
+    idx = np.flatnonzero(mask)
+    n = int(round(mask.sum()*points_per_pixel))
+    pick = idx[rng.choice(idx.size, n, p=mask.ravel()[idx]/mask.ravel()[idx].sum())] if n else idx[:0]
+    i, j = np.unravel_index(pick, mask.shape)
+    return (i + rng.random(n))*pixel_size, (j + rng.random(n))*pixel_size
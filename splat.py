@@ -0,0 +1,149 @@
+"""
+Windowed scatter-add of Gaussian and donut footprints onto pixel grids.
+
+This is the kernel behind manim/psf.py render_emitters and the SMLM
+renderers in smlm_render.py. Every emitter is only evaluated on the grid
+points within +/- n_sigma*sig of it, and the footprints of a chunk of
+emitters are accumulated into the output in one call.
+"""
+
+import numpy as np
+
+KINDS = ('gauss', 'donut')
+
+def _step(grid):
+    # Spacing of an evenly spaced grid, None for irregular ones
+    if grid.size < 2:
+        return None
+    d = np.diff(grid)
+    return float(d[0]) if np.allclose(d, d[0], rtol=1e-9, atol=0) else None
+
+def window(grid, mu, half_width, step=None):
+    """
+    Per-emitter index windows into the increasing 1D grid covering
+    mu +/- half_width.
+
+    step is the spacing of an evenly spaced grid (see splat), which finds
+    the windows arithmetically instead of by binary search.
+
+    Returns
+    -------
+    idx : np.array
+        (K, W) grid indices, clipped into range.
+    valid : np.array
+        (K, W) mask of the indices inside each emitter's window.
+    """
+    n = grid.size
+    if step is None:
+        lo = np.searchsorted(grid, mu-half_width, side='left')
+        hi = np.searchsorted(grid, mu+half_width, side='right')
+    else:
+        lo = np.clip(np.ceil((mu-half_width-grid[0])/step), 0, n).astype(np.intp)
+        hi = np.clip(np.floor((mu+half_width-grid[0])/step)+1, 0, n).astype(np.intp)
+    w = max(int(np.max(hi-lo, initial=0)), 1)
+    idx = lo[:,None] + np.arange(w)[None,:]
+    valid = idx < hi[:,None]
+    return np.minimum(idx, n-1), valid
+
+def scatter_add(out, idx, weights=None):
+    """
+    out.flat[idx] += weights (1 if None), repeated indices accumulating.
+
+    Large batches are summed with np.bincount, small ones with np.add.at.
+    out may be any array: views that are not C-contiguous, for which
+    out.reshape(-1) would be a copy, are accumulated through a temporary.
+    """
+    if not out.flags.c_contiguous:
+        tmp = np.zeros(out.shape, dtype=out.dtype)
+        scatter_add(tmp, idx, weights)
+        out += tmp
+        return out
+
+    flat = out.reshape(-1)
+    if idx.size >= flat.size//8:
+        flat += np.bincount(idx, weights, minlength=flat.size).astype(flat.dtype, copy=False)
+    else:
+        np.add.at(flat, idx, 1 if weights is None else weights.astype(flat.dtype, copy=False))
+    return out
+
+def splat(out, x, y, mu_x, mu_y, sig, amp=1, frames=None, kind='gauss', n_sigma=4, chunk_size=4096):
+    """
+    Scatter-add Gaussian or donut footprints into a frame or stack.
+
+    Parameters
+    ----------
+    out : np.array
+        (len(x), len(y)) frame, or (n_frames, len(x), len(y)) stack if
+        frames is given, accumulated into (it is not zeroed first).
+    x, y : np.array
+        Increasing pixel coordinates of the last two axes of out.
+    mu_x, mu_y : np.array
+        (K,) emitter positions.
+    sig, amp : float or np.array
+        Width and amplitude (peak value), scalar or one per emitter.
+    frames : np.array
+        Optional (K,) frame index of each emitter into the first axis of out,
+        ValueError if out of range.
+    kind : str
+        'gauss' exp(-q) or 'donut' e*q*exp(-q), q = r^2/(2 sig^2), as
+        psf.gauss2D and psf.donut2D.
+    n_sigma : float
+        Half width of the evaluation window in units of sig.
+    chunk_size : int
+        Number of emitters evaluated per batch, bounds temporary memory.
+        Emitters are batched in order of width, as every batch is evaluated
+        on windows as wide as its widest emitter.
+
+    Returns
+    -------
+    out
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown emitter kind '{kind}', expected 'gauss' or 'donut'")
+    mu_x, mu_y = np.asarray(mu_x, dtype=float).ravel(), np.asarray(mu_y, dtype=float).ravel()
+    K = mu_x.size
+    sig = np.broadcast_to(np.asarray(sig, dtype=float), (K,))
+    amp = np.broadcast_to(np.asarray(amp, dtype=float), (K,))
+    frames = np.zeros(K, dtype=np.intp) if frames is None else np.asarray(frames, dtype=np.intp)
+
+    if out.shape[-2:] != (x.size, y.size):
+        raise ValueError(f"out has shape {out.shape}, expected (..., {x.size}, {y.size})")
+    n_frames = out.shape[0] if out.ndim == 3 else 1
+    if frames.shape != (K,):
+        raise ValueError(f"frames has shape {frames.shape}, expected ({K},)")
+    if K and (frames.min() < 0 or frames.max() >= n_frames):
+        raise ValueError(f"frames range from {frames.min()} to {frames.max()}, out has {n_frames} frame(s)")
+
+    # one wide emitter would widen the windows of its whole chunk
+    if K > chunk_size and np.ptp(sig) > 0:
+        order = np.argsort(sig, kind='stable')
+        mu_x, mu_y, sig, amp, frames = mu_x[order], mu_y[order], sig[order], amp[order], frames[order]
+
+    # accumulate once into a contiguous buffer rather than per chunk
+    acc = out if out.flags.c_contiguous else np.zeros(out.shape, dtype=out.dtype)
+    step_x, step_y = _step(x), _step(y)
+
+    for start in range(0, K, chunk_size):
+        sl = slice(start, start+chunk_size)
+        mx, my, s, a, f = mu_x[sl], mu_y[sl], sig[sl], amp[sl], frames[sl]
+
+        ix, vx = window(x, mx, n_sigma*s, step_x)
+        iy, vy = window(y, my, n_sigma*s, step_y)
+        inv = 1/(2*s*s)
+        qx = ((x[ix]-mx[:,None])**2)*inv[:,None]
+        qy = ((y[iy]-my[:,None])**2)*inv[:,None]
+        ex = np.exp(-qx)*vx
+        ey = np.exp(-qy)*vy
+
+        if kind == 'gauss':
+            fp = (ex*a[:,None])[:,:,None]*ey[:,None,:]
+        else:
+            fp = np.e*((qx*ex)[:,:,None]*ey[:,None,:] + ex[:,:,None]*(qy*ey)[:,None,:])
+            fp *= a[:,None,None]
+
+        idx = (f[:,None,None]*x.size + ix[:,:,None])*y.size + iy[:,None,:]
+        scatter_add(acc, idx.ravel(), fp.ravel())
+
+    if acc is not out:
+        out += acc
+    return out
@@ -0,0 +1,16 @@
+import os
+import sys
+import importlib
+
+import pytest
+
+# the library modules live at the repository root and the scene-side
+# modules (psf, raster_scan, ...) in manim/, neither is an installed package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(1, os.path.join(ROOT, 'manim'))
+
+@pytest.fixture(scope='session')
+def psf():
+    """ manim/psf.py """
+    return importlib.import_module('psf')
@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+import pytest
+
+import image_pyramid
+from image_pyramid import ImagePyramid, TiledViewport, downsample2, image_key
+
+def mean2(a):
+    # 2x2 block mean by reshaping, odd trailing rows/columns dropped
+    h, w = a.shape[0]//2, a.shape[1]//2
+    return a[:2*h, :2*w].astype(float).reshape((h, 2, w, 2) + a.shape[2:]).mean(axis=(1, 3))
+
+@pytest.mark.parametrize('shape', [(37, 52), (40, 21, 3)])
+@pytest.mark.parametrize('band_rows', [4, 7, 1024])
+def test_downsample2(shape, band_rows):
+    a = np.random.default_rng(0).random(shape).astype(np.float32)
+    np.testing.assert_allclose(downsample2(a, band_rows=band_rows), mean2(a), rtol=1e-6)
+
+def test_downsample2_rounds_integers():
+    a = np.array([[0, 1], [1, 1]], dtype=np.uint8)  # mean 0.75
+    assert downsample2(a)[0, 0] == 1
+    a = np.random.default_rng(1).integers(0, 2**16, (30, 30), dtype=np.uint16)
+    out = downsample2(a, band_rows=6)
+    assert out.dtype == np.uint16
+    assert np.abs(out - mean2(a)).max() <= 0.5
+
+@pytest.fixture
+def image_file(tmp_path):
+    path = tmp_path/'image.npy'
+    np.save(path, np.random.default_rng(2).integers(0, 1000, (300, 200), dtype=np.uint16))
+    return path
+
+def test_levels(image_file):
+    image = np.load(image_file)
+    pyramid = ImagePyramid(image, tile_size=64)
+    assert pyramid.n_levels == 4
+    np.testing.assert_array_equal(pyramid.level(2), downsample2(downsample2(image)))
+    with pytest.raises(IndexError):
+        pyramid.level(4)
+
+def test_level_files_reused(image_file, tmp_path, monkeypatch):
+    cache = tmp_path/'cache'
+    first = ImagePyramid(np.load(image_file, mmap_mode='r'), 64, str(cache), 'image')
+    ref = [np.array(first.level(k)) for k in range(first.n_levels)]
+    files = sorted(os.listdir(cache))
+    assert len(files) == first.n_levels-1 and all(f.endswith('.npy') for f in files)
+
+    calls = []
+    monkeypatch.setattr(image_pyramid, 'downsample2', lambda *a: calls.append(a))
+    second = ImagePyramid(np.load(image_file, mmap_mode='r'), 64, str(cache), 'image')
+    assert second.key == first.key
+    for k in range(second.n_levels):
+        np.testing.assert_array_equal(second.level(k), ref[k])
+    assert not calls and sorted(os.listdir(cache)) == files
+
+def test_image_key(image_file):
+    key = image_key(np.load(image_file, mmap_mode='r'))
+    assert image_key(np.load(image_file, mmap_mode='r')) == key
+    # a rewritten file, the same data in memory or another dtype are new images
+    image = np.load(image_file)
+    assert image_key(image) != key
+    assert image_key(image.astype(np.int32)) != image_key(image)
+    image[150] += 1
+    np.save(image_file, image)
+    assert image_key(np.load(image_file, mmap_mode='r')) != key
+
+def render_reference(viewport):
+    # every screen pixel looks up its level pixel directly, no tiles
+    k = viewport.current_level()
+    level = np.asarray(viewport.pyramid.level(k), dtype=np.float32)
+    lo, hi = viewport.cache.lo, viewport.cache.hi
+    scaled = np.clip((level-lo)*np.float32(255/(hi-lo)), 0, 255).astype(np.uint8)
+
+    d = 2**k
+    out = np.zeros_like(viewport.buffer)
+    for sy in range(viewport.height):
+        for sx in range(viewport.width):
+            y = int(np.floor((viewport.cy + (sy+0.5-viewport.height/2)/viewport.zoom)/d))
+            x = int(np.floor((viewport.cx + (sx+0.5-viewport.width/2)/viewport.zoom)/d))
+            if 0 <= y < level.shape[0] and 0 <= x < level.shape[1]:
+                out[sy, sx] = scaled[y, x]
+    return out
+
+@pytest.mark.parametrize('channels', [(), (3,)])
+def test_render_nearest_neighbour(channels):
+    image = np.random.default_rng(3).random((300, 200) + channels).astype(np.float32)
+    viewport = TiledViewport(ImagePyramid(image, tile_size=32), width=48, height=40, lo=0.1, hi=0.9)
+    views = [lambda v: None,                          # fitted, coarse level
+             lambda v: v.zoom_at(8),                  # zoomed in on the center
+             lambda v: v.zoom_at(3.1, 5, 7),          # off-center, fractional zoom
+             lambda v: v.pan(30, -17),                # panned
+             lambda v: v.zoom_at(0.05),               # smaller than the view
+             lambda v: v.zoom_at(2)]                  # level 1
+    for change in views:
+        change(viewport)
+        np.testing.assert_array_equal(viewport.render(), render_reference(viewport))
+    assert viewport.cache.hits > 0
@@ -0,0 +1,68 @@
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from movie_export import export_movie, scale_frames, stack_bounds, write_gif, write_mp4
+
+PIL = pytest.importorskip('PIL')
+from PIL import Image, ImageSequence
+
+def read_gif(path):
+    with Image.open(path) as im:
+        frames = [(np.array(f.convert('L')), f.info['duration']) for f in ImageSequence.Iterator(im)]
+        return frames, im.info.get('loop')
+
+@pytest.fixture
+def stack():
+    rng = np.random.default_rng(0)
+    return rng.normal(10, 3, (5, 24, 31)).astype(np.float32)
+
+def test_stack_bounds(stack):
+    assert stack_bounds(stack, chunk_size=2) == (stack.min(), stack.max())
+    assert stack_bounds(stack, 1, 3) == (stack[1:3].min(), stack[1:3].max())
+
+def test_scale_frames(stack):
+    lo, hi = 5, 15
+    out = list(scale_frames(stack, lo, hi))
+    ref = np.clip((stack.astype(float)-lo)*255/(hi-lo), 0, 255)
+    assert all(f.dtype == np.uint8 for f in out)
+    assert np.abs(np.array(out, dtype=float) - ref).max() <= 1
+    with pytest.raises(ValueError):
+        next(scale_frames(stack))
+
+def test_gif_round_trip(stack, tmp_path):
+    path = tmp_path/'movie.gif'
+    lo, hi = stack_bounds(stack)
+    # streamed from a generator, never a whole array
+    assert write_gif((f for f in stack), path, duration=40, loop=2, lo=lo, hi=hi) == len(stack)
+
+    frames, loop = read_gif(path)
+    assert len(frames) == len(stack) and loop == 2
+    assert [d for _, d in frames] == [40]*len(stack)
+    # grayscale frames are stored losslessly
+    for (img, _), ref in zip(frames, scale_frames(stack, lo, hi)):
+        np.testing.assert_array_equal(img, ref)
+
+def test_gif_rgb(tmp_path):
+    rgb = np.zeros((3, 8, 8, 3), dtype=np.uint8)
+    for k in range(3):
+        rgb[k, :, :, k] = 200
+    path = tmp_path/'rgb.gif'
+    export_movie(rgb, str(path), fps=20)
+    with Image.open(path) as im:
+        frames = [(np.array(f.convert('RGB')), f.info['duration']) for f in ImageSequence.Iterator(im)]
+    assert len(frames) == 3 and all(d == 50 for _, d in frames)
+    for (img, _), ref in zip(frames, rgb):
+        np.testing.assert_array_equal(img, ref)
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="ffmpeg is not installed")
+def test_mp4_round_trip(stack, tmp_path):
+    path = tmp_path/'movie.mp4'
+    lo, hi = stack_bounds(stack)
+    assert write_mp4(stack, str(path), fps=10, lo=lo, hi=hi) == len(stack)
+    probe = subprocess.run(['ffmpeg', '-v', 'error', '-i', str(path), '-f', 'rawvideo', '-pix_fmt', 'gray', '-'],
+                           capture_output=True, check=True)
+    # padded to even dimensions
+    assert len(probe.stdout) == len(stack)*24*32
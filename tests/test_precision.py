@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from widefield_psf import widefield_psf_3d, widefield_psf_2d, intensity_psf
+
+# single precision results must agree with double precision to this
+# fraction of the peak
+RTOL = 1e-6
+
+def assert_close_to_peak(low, ref, rtol=RTOL):
+    err = np.abs(np.asarray(low, dtype=ref.dtype) - ref).max()
+    assert err <= rtol*np.abs(ref).max(), f"max error {err:.3g} vs peak {np.abs(ref).max():.3g}"
+
+@pytest.fixture
+def grid():
+    return np.linspace(-3, 3, 257)
+
+@pytest.mark.parametrize('kwargs', [{}, dict(a=2, mu=[0.3, -0.7], sig=0.6, b=0.1)])
+def test_gauss2D_float32(psf, grid, kwargs):
+    low = psf.gauss2D(grid, grid, dtype=np.float32, **kwargs)
+    ref = psf.gauss2D(grid, grid, dtype=np.float64, **kwargs)
+    assert low.dtype == np.float32
+    assert_close_to_peak(low, ref)
+
+@pytest.mark.parametrize('kwargs', [{}, dict(a=2, mu=[0.3, -0.7], sig=0.6, b=0.1), dict(sigp=0.5)])
+def test_donut2D_float32(psf, grid, kwargs):
+    low = psf.donut2D(grid, grid, dtype=np.float32, **kwargs)
+    ref = psf.donut2D(grid, grid, dtype=np.float64, **kwargs)
+    assert low.dtype == np.float32
+    assert_close_to_peak(low, ref)
+
+@pytest.mark.parametrize('c', [None, (1, 0.5, 0.2)])
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_colorize(psf, c, dtype):
+    arr = np.random.default_rng(0).uniform(-0.1, 1.1, (64, 64))
+    img = psf.colorize(arr.astype(dtype), c=c)
+
+    # float64 reference, clipped to [0, 1] and truncated as the original colorize
+    q = 255*np.clip(arr, 0, 1)
+    ref = q.astype(np.uint8) if c is None else (q[...,None]*np.asarray(c)).astype(np.uint8)
+
+    diff = np.abs(img[...,:3].astype(int) - ref) if c is not None else np.abs(img.astype(int) - ref)
+    assert img.dtype == np.uint8
+    # the color LUT truncates twice (to a level, then times c), which may lose one more level
+    assert diff.max() <= (0 if c is None else 1)
+    assert np.count_nonzero(diff) <= 0.3*diff.size
+
+def test_widefield_psf_3d_complex64():
+    args = (600, 1.4, 1.515, 50, 128, np.arange(-4, 5)*150)
+    low = widefield_psf_3d(*args, dtype=np.complex64)
+    ref = widefield_psf_3d(*args, dtype=np.complex128)
+    assert low.dtype == np.complex64
+    assert_close_to_peak(low, ref)
+    assert_close_to_peak(intensity_psf(low), intensity_psf(ref))
+
+def test_widefield_psf_2d_roi_complex64():
+    args = (600, 1.4, 1.515, 50, 128, 200)
+    roi = (slice(40, 90), slice(50, 80))
+    low = widefield_psf_2d(*args, roi=roi, dtype=np.complex64)
+    ref = widefield_psf_2d(*args, dtype=np.complex128)[roi]
+    assert low.dtype == np.complex64
+    assert_close_to_peak(low, ref)
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+import psf_benchmarks
+from psf_benchmarks import find_baseline, load_results, save_results
+
+def rows(*sizes):
+    return [{'kernel': 'gauss2D', 'size': s, 'dtype': 'float32', 'median': s*1e-6} for s in sizes]
+
+def test_partial_run_keeps_stored_cases(tmp_path):
+    save_results(rows(256, 1024), 'abc1234', tmp_path)
+    path = save_results(rows(64, 256), 'abc1234', tmp_path)
+    stored = {r['size']: r for r in load_results(path)['results']}
+    assert sorted(stored) == [64, 256, 1024]
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    # HEAD = c3 <- c2 <- c1; mtimes deliberately out of order
+    log = {('rev-list', 'HEAD'): 'c3ffffff\nc2eeeeee\nc1dddddd'}
+    monkeypatch.setattr(psf_benchmarks, '_git', lambda *args: log.get(args, ''))
+    for name in ('c1dddd', 'c2eeee-dirty', 'c2eeee', 'c3ffff'):
+        (tmp_path/f"{name}.json").write_text(json.dumps({'commit': name, 'results': []}))
+    (tmp_path/'c1dddd.json').touch()
+    return tmp_path
+
+def test_default_baseline_is_nearest_ancestor(history):
+    assert find_baseline(None, 'c3ffff', history) == str(history/'c2eeee.json')
+    # a dirty tree compares against its own HEAD
+    assert find_baseline(None, 'c3ffff-dirty', history) == str(history/'c3ffff.json')
+    (history/'c2eeee.json').unlink()
+    assert find_baseline(None, 'c3ffff', history) == str(history/'c1dddd.json')
+
+def test_explicit_baseline(history):
+    assert find_baseline('c2eeee-dirty', None, history) == str(history/'c2eeee-dirty.json')
+    assert find_baseline('missing', None, history) is None
+    with pytest.raises(SystemExit):
+        psf_benchmarks.main(['--baseline', 'missing', '--results-dir', str(history)])
@@ -0,0 +1,33 @@
+import numpy as np
+
+from psf_cache import PSFCache, cached_widefield_psf_3d
+from widefield_psf import widefield_psf_3d
+
+def test_put_keeps_a_private_copy(tmp_path):
+    cache = PSFCache(cache_dir=tmp_path)
+    arr = np.arange(5.0)
+    cached = cache.put('k', arr)
+
+    assert arr.flags.writeable
+    assert not cached.flags.writeable
+    arr[0] = 100
+    np.testing.assert_array_equal(cache.get('k'), np.arange(5.0))
+
+    # the in-memory and on-disk entries agree
+    cache.clear()
+    np.testing.assert_array_equal(cache.get('k'), np.arange(5.0))
+    assert cache.stats['disk_hits'] == 1
+
+def test_roi_is_part_of_the_key():
+    cache = PSFCache()
+    args = (600, 1.4, 1.515, 50, 64, [0, 200])
+    roi = (slice(20, 40), slice(10, 30))
+
+    full = cached_widefield_psf_3d(*args, cache=cache)
+    crop = cached_widefield_psf_3d(*args, roi=roi, cache=cache)
+    same = cached_widefield_psf_3d(*args, roi=(np.arange(20, 40), np.arange(10, 30)), cache=cache)
+
+    assert crop.shape == (2, 20, 20)
+    assert same is crop
+    np.testing.assert_allclose(crop, widefield_psf_3d(*args)[:, 20:40, 10:30], atol=1e-12)
+    assert full.shape == (2, 64, 64) and len(cache) == 2
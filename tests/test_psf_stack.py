@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from widefield_psf import widefield_psf_3d, intensity_psf
+from psf_stack import widefield_psf_3d_to_file, otf_3d
+
+PARAMS = dict(wvl=600, NA=1.4, n=1.515, pixel_size=50, chip_size=32)
+Z = np.arange(-6, 6)*100
+
+@pytest.fixture(scope='module')
+def reference():
+    return np.fft.fftn(intensity_psf(widefield_psf_3d(*PARAMS.values(), Z)))
+
+@pytest.mark.parametrize('dtype', [np.complex64, np.complex128])
+@pytest.mark.parametrize('intensity', [False, True])
+@pytest.mark.parametrize('to_file', [False, True])
+def test_otf_3d_matches_fftn(tmp_path, reference, dtype, intensity, to_file):
+    stack = widefield_psf_3d_to_file(*PARAMS.values(), Z, tmp_path/'psf.npy', dtype=np.complex128,
+                                     intensity=intensity, chunk_size=5)
+    # chunk and block sizes that leave partial last chunks/blocks
+    otf = otf_3d(stack, tmp_path/'otf.npy' if to_file else None, dtype=dtype,
+                 chunk_size=5, block_size=7)
+
+    assert otf.shape == reference.shape
+    assert otf.dtype == dtype
+    assert isinstance(otf, np.memmap) == to_file
+    # error relative to the OTF peak
+    assert np.abs(otf - reference).max() <= 1e-6*np.abs(reference).max()
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from raster_scan import raster_scan, scan_image, emitter_map
+
+signal = pytest.importorskip('scipy.signal')
+
+@pytest.mark.parametrize('kshape', [(7, 5), (8, 6), (8, 5), (32, 32)])
+@pytest.mark.parametrize('block_rows', [1, 7, 64])
+def test_matches_scipy_correlate(kshape, block_rows):
+    rng = np.random.default_rng(0)
+    sample = rng.random((60, 70))
+    psf = rng.random(kshape)
+    image = scan_image(sample, psf, block_rows=block_rows, dtype=np.float64)
+    np.testing.assert_allclose(image, signal.correlate(sample, psf, mode='same'), atol=1e-10)
+
+@pytest.mark.parametrize('kshape', [(8, 6), (7, 5), (128, 128)])
+def test_delta_stays_in_place(kshape):
+    # a PSF peaked at (kh//2, kw//2), as widefield_psf_2d chips at chip_size//2
+    kh, kw = kshape
+    psf = np.zeros(kshape)
+    psf[kh//2, kw//2] = 1
+    sample = emitter_map([(18.5, 26.5)], (40, 50))
+    image = scan_image(sample, psf)
+    assert np.unravel_index(np.argmax(image), image.shape) == (18, 26)
+
+def test_blocks_cover_the_image():
+    sample = np.random.default_rng(1).random((50, 20))
+    rows = [(r0, lines.shape) for r0, lines in raster_scan(sample, np.ones((3, 3)), block_rows=16)]
+    assert rows == [(0, (16, 20)), (16, (16, 20)), (32, (16, 20)), (48, (2, 20))]
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def scene():
+    rng = np.random.default_rng(0)
+    x = np.linspace(-3, 3, 64)
+    y = np.linspace(-3, 3, 48)
+    mu = rng.uniform(-2, 2, (50, 2))
+    return x, y, mu
+
+@pytest.mark.parametrize('kind', ['gauss', 'donut'])
+def test_matches_sum_of_kernels(psf, scene, kind):
+    x, y, mu = scene
+    kernel = psf.gauss2D if kind == 'gauss' else psf.donut2D
+    ref = sum(kernel(x, y, mu=m, sig=0.3) for m in mu)
+    img = psf.render_emitters(x, y, mu, sig=0.3, kind=kind, n_sigma=8)
+    np.testing.assert_allclose(img, ref, atol=1e-9)
+
+@pytest.mark.parametrize('view', [
+    lambda: np.ones((48, 64)).T,
+    lambda: np.ones((64, 96))[:, ::2],
+    lambda: np.ones((128, 48))[::-2],
+])
+def test_non_contiguous_out(psf, scene, view):
+    x, y, mu = scene
+    ref = psf.render_emitters(x, y, mu, sig=0.3)
+
+    out = view()
+    assert out.shape == ref.shape and not out.flags.c_contiguous
+    psf.render_emitters(x, y, mu, sig=0.3, out=out)
+    np.testing.assert_allclose(out, ref + 1)
+
+def test_out_shape_mismatch(psf, scene):
+    x, y, mu = scene
+    with pytest.raises(ValueError):
+        psf.render_emitters(x, y, mu, out=np.zeros((len(y), len(x))))
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from smlm_kinetics import expand_bursts, localization_precision, simulate_blinking, simulate_bursts
+
+P_ON, P_OFF, P_BLEACH = 0.05, 0.2, 0.05
+
+@pytest.fixture(scope='module')
+def bursts():
+    # bleaching ends every chain after ~100 frames, far from the end of the acquisition
+    return simulate_bursts(4000, 10**5, P_ON, P_OFF, P_BLEACH, rng=0)
+
+def test_on_dwell(bursts):
+    # geometric with exit probability p_off + p_bleach
+    assert bursts['length'].mean() == pytest.approx(1/(P_OFF+P_BLEACH), rel=0.03)
+
+def test_off_dwell(bursts):
+    b = bursts[np.lexsort((bursts['start'], bursts['emitter']))]
+    same = b['emitter'][1:] == b['emitter'][:-1]
+    gaps = (b['start'][1:] - b['start'][:-1] - b['length'][:-1])[same]
+    assert gaps.min() >= 1
+    assert gaps.mean() == pytest.approx(1/P_ON, rel=0.03)
+
+def test_bursts_per_emitter(bursts):
+    # every exit from the on state bleaches with probability p_bleach/(p_off + p_bleach)
+    counts = np.bincount(bursts['emitter'], minlength=4000)
+    assert counts.mean() == pytest.approx((P_OFF+P_BLEACH)/P_BLEACH, rel=0.05)
+
+@pytest.mark.parametrize('start_on', [0, 0.5])
+def test_bursts_inside_frames(start_on):
+    n_frames = 50
+    b = simulate_bursts(2000, n_frames, 0.1, 0.02, start_on=start_on, rng=1)
+    assert b['length'].min() >= 1
+    assert b['start'].min() >= 0 and (b['start'] + b['length']).max() <= n_frames
+    # truncated at the last frame rather than dropped
+    assert (b['start'] + b['length']).max() == n_frames
+
+    emitter, frame = expand_bursts(b)
+    assert emitter.size == b['length'].sum()
+    assert frame.min() >= 0 and frame.max() < n_frames
+    # no emitter is on twice in one frame
+    assert np.unique(emitter*n_frames + frame).size == emitter.size
+
+def test_blinking_sorted_by_frame():
+    locs = simulate_blinking(500, 200, 0.1, 0.3, 0.02, photons=50, min_photons=10, rng=2)
+    assert np.all(np.diff(locs['frame']) >= 0)
+    assert locs['frame'].max() < 200 and locs['photons'].min() > 10
+
+def test_precision_sqrt_n():
+    N = np.array([10, 100, 1000, 10000])
+    np.testing.assert_allclose(localization_precision(N, 1.3), 1.3/np.sqrt(N))
+    # the pixelation and background terms only add to it
+    assert np.all(localization_precision(N, 1.3, pixel_size=1, background=2) > 1.3/np.sqrt(N))
+    np.testing.assert_allclose(localization_precision(N, 1.3, pixel_size=1e-6), 1.3/np.sqrt(N), rtol=1e-9)
+
+@pytest.mark.parametrize('N', [25, 400])
+def test_precision_of_centroid(N):
+    # the centroid of N photons of a Gaussian spot scatters by sigma/sqrt(N)
+    rng = np.random.default_rng(3)
+    estimates = rng.normal(0, 1.3, (20000, N)).mean(axis=1)
+    assert estimates.std() == pytest.approx(localization_precision(N, 1.3), rel=0.03)
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from smlm_render import render_histogram, render_gaussian, render_triangulation
+
+BOUNDS = (0, 0, 1000, 1000)
+
+@pytest.fixture(scope='module')
+def uniform():
+    # 2 localizations per 100 x 100 area, over a margin around the bounds
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(-200, 1200, (2, 39200))
+    return x, y, 39200/1400**2
+
+def test_histogram_density(uniform):
+    x, y, density = uniform
+    img = render_histogram(x, y, BOUNDS, 50, density=True)
+    assert img.mean() == pytest.approx(density, rel=0.05)
+
+def test_gaussian_density(uniform):
+    x, y, density = uniform
+    img = render_gaussian(x, y, 20, BOUNDS, 10, density=True)
+    # away from the zero padded edges
+    assert img[10:-10, 10:-10].mean() == pytest.approx(density, rel=0.05)
+
+def test_triangulation_density(uniform):
+    x, y, density = uniform
+    img = render_triangulation(x, y, BOUNDS, 20, n_jitter=3, rng=0)
+    assert img.mean() == pytest.approx(density, rel=0.05)
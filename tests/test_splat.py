@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from splat import scatter_add, splat, window, _step
+
+@pytest.mark.parametrize('n', [10, 10**5])  # np.add.at and np.bincount paths
+def test_scatter_add_repeated_indices(n):
+    rng = np.random.default_rng(0)
+    idx = rng.integers(0, 1000, n)
+    w = rng.random(n)
+    out = np.zeros(1000)
+    scatter_add(out, idx, w)
+    ref = np.zeros(1000)
+    for i, v in zip(idx, w):
+        ref[i] += v
+    np.testing.assert_allclose(out, ref)
+
+def test_scatter_add_non_contiguous():
+    buf = np.zeros((20, 30))
+    scatter_add(buf.T, np.array([0, 0, 1]))
+    # flat index 1 of the (30, 20) view is element (1, 0) of buf
+    assert buf[0, 0] == 2 and buf[1, 0] == 1 and buf.sum() == 3
+
+def test_window_regular_matches_search():
+    rng = np.random.default_rng(1)
+    grid = np.linspace(-3, 3, 101)
+    mu, hw = rng.uniform(-4, 4, 500), rng.uniform(0, 1, 500)
+    i0, v0 = window(grid, mu, hw)
+    i1, v1 = window(grid, mu, hw, _step(grid))
+    np.testing.assert_array_equal(v0, v1)
+    np.testing.assert_array_equal(i0[v0], i1[v1])
+    assert _step(grid**3) is None
+
+def test_splat_frames():
+    x, y = np.linspace(0, 1, 11), np.linspace(0, 2, 21)
+    out = np.zeros((3, 11, 21))
+    splat(out, x, y, [0.5, 0.5], [1, 1], 0.1, amp=[1, 2], frames=[0, 2])
+    assert out[0].max() == pytest.approx(1) and out[2].max() == pytest.approx(2)
+    assert not out[1].any()
+
+def test_splat_frames_out_of_range():
+    x = y = np.linspace(0, 1, 11)
+    for f in ([0, 3], [-1, 0]):
+        with pytest.raises(ValueError, match='frames'):
+            splat(np.zeros((3, 11, 11)), x, y, [0.5, 0.5], [0.5, 0.5], 0.1, frames=f)
+    with pytest.raises(ValueError, match='frames'):
+        splat(np.zeros((11, 11)), x, y, [0.5], [0.5], 0.1, frames=[1])
+
+def test_splat_batches_by_width(monkeypatch):
+    import splat as splat_module
+    widths = []
+    def recording_window(*args):
+        idx, valid = window(*args)
+        widths.append(idx.shape[1])
+        return idx, valid
+    monkeypatch.setattr(splat_module, 'window', recording_window)
+
+    rng = np.random.default_rng(2)
+    x = y = np.arange(200.)
+    mu = rng.uniform(0, 200, (2, 64))
+    sig = np.full(64, 0.5)
+    sig[3::8] = 20  # one wide emitter in every chunk of 8
+    out = splat(np.zeros((200, 200)), x, y, mu[0], mu[1], sig, chunk_size=8)
+    # sorted by width, the wide emitters share a single chunk
+    assert sum(w > 10 for w in widths) == 2
+
+    ref = np.zeros((200, 200))
+    for k in range(64):
+        splat(ref, x, y, mu[0,k:k+1], mu[1,k:k+1], sig[k])
+    np.testing.assert_allclose(out, ref, atol=1e-12)
@@ -0,0 +1,12 @@
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('saturation', [1.6, 5.4, 12.7, 52.5])
+def test_sted_sigma_matches_sted1D(psf, saturation):
+    # half maximum width of the modelled effective PSF, as a Gaussian sigma
+    x = np.linspace(-3, 3, 60001)
+    y = psf.sted1D(x, saturation)
+    half = x[y >= y.max()/2]
+    fwhm_sigma = (half.max() - half.min())/(2*np.sqrt(2*np.log(2)))
+    assert fwhm_sigma == pytest.approx(psf.sted_sigma(1, saturation), rel=0.1)
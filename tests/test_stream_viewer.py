@@ -0,0 +1,109 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import tk_stream_viewer
+from tk_gui_benchmarks import Backend
+from tk_stream_viewer import FrameRing, Producer, StreamViewer
+
+def test_ring_needs_three_slots():
+    with pytest.raises(ValueError):
+        FrameRing((4, 4), n_slots=2)
+
+@pytest.mark.parametrize('n_slots', [3, 4, 6])
+def test_acquire_skips_latest_and_read_slot(n_slots):
+    ring = FrameRing((2, 2), n_slots=n_slots)
+    for _ in range(5*n_slots):
+        i = ring.acquire()
+        ring.commit(i)
+        _, seq, _ = ring.latest()
+        assert seq == ring.count
+        # while that frame is read, commits only ever go to other slots
+        for _ in range(2*n_slots):
+            j = ring.acquire()
+            assert j != i and j != ring._latest
+            ring.commit(j)
+        ring.release()
+
+def test_latest_after():
+    ring = FrameRing((2, 2))
+    assert ring.latest() is None
+    ring.commit(ring.acquire())
+    assert ring.latest(after=1) is None
+    assert ring.latest(after=0)[1] == 1
+    ring.release()
+
+def test_frames_not_overwritten_while_read():
+    # a fast producer writes the sequence number into every pixel; a frame
+    # held by the reader must keep its value until it is released
+    ring = FrameRing((64, 64), dtype=np.int64, n_slots=3)
+    stop = threading.Event()
+
+    def produce():
+        while not stop.is_set():
+            i = ring.acquire()
+            ring.frames[i] = ring.count + 1
+            ring.commit(i)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        last, checked = 0, 0
+        deadline = time.perf_counter() + 0.5
+        while time.perf_counter() < deadline:
+            got = ring.latest(last)
+            if got is None:
+                continue
+            frame, seq, _ = got
+            try:
+                assert seq > last
+                time.sleep(1e-4)
+                assert np.all(frame == seq)
+            finally:
+                ring.release()
+            last, checked = seq, checked + 1
+    finally:
+        stop.set()
+        thread.join()
+    assert checked > 10
+
+class NullBackend(Backend):
+    # offscreen backend without an event loop, StreamViewer polls it
+    name = 'null'
+
+    def first_draw(self, arr):
+        self.last = arr.copy()
+
+    def show(self, arr):
+        self.last = arr.copy()
+
+def test_viewer_stats(monkeypatch):
+    monkeypatch.setitem(tk_stream_viewer.BACKENDS, 'null', NullBackend)
+    ring = FrameRing((8, 8))
+    viewer = StreamViewer(ring, 'null')
+    viewer._start = time.perf_counter()
+    for k in range(10):
+        ring.commit(ring.acquire())
+        if k % 3 == 0:
+            assert viewer.tick()  # shows frames 1, 4, 7 and 10
+    assert not viewer.tick()
+    stats = viewer.stats()
+    assert (stats['produced'], stats['shown'], stats['dropped']) == (10, 4, 6)
+
+def test_viewer_run_snapshots_produced(monkeypatch):
+    monkeypatch.setitem(tk_stream_viewer.BACKENDS, 'null', NullBackend)
+    ring = FrameRing((8, 8))
+    producer = Producer(ring, lambda out: None, fps=2000)
+    viewer = StreamViewer(ring, 'null')
+    producer.start()
+    try:
+        stats = viewer.run(0.2)
+        time.sleep(0.02)
+        # the producer is still running, stats keep the end-of-run count
+        assert viewer.stats() == stats
+    finally:
+        producer.stop()
+    assert 0 < stats['shown'] <= stats['produced'] < ring.count
+    assert stats['dropped'] == viewer.last_seq - stats['shown'] >= 0
@@ -4,96 +4,336 @@
 """
 Benchmark different GUI image draw times in tkinter
 
+Every backend draws into a Tk window (except 'agg', which renders matplotlib
+offscreen) without entering mainloop(), so a whole sweep over image sizes,
+dtypes and channel counts runs unattended. For each case the first draw
+(widget/texture creation included) is timed separately from updates of the
+already displayed image, after a few warm-up updates.
+
+Usage:
+    python tk_gui_benchmarks.py [-b pil matplotlib vispy agg] [-s 256 1024 4096]
+                                [-d uint8 uint16 float32] [-c 1 3] [-n 20]
+                                [--json results.json] [--csv results.csv]
+
 Environment setup instructions:
     conda create -n gui-test tk matplotlib pillow vispy
     pip install pyopengltk
 """
 
+import abc
+import sys
+import csv
+import json
 import time
-import tkinter as tk
+import argparse
+import platform
+
 import numpy as np
 
-from PIL import Image, ImageTk
+SIZES = (256, 512, 1024, 2048, 4096)
+DTYPES = ('uint8', 'uint16', 'float32')
+CHANNELS = (1, 3)
 
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
+def make_image(size, dtype='uint8', channels=3, seed=0):
+    """ Random (size, size[, channels]) test image spanning the full range of dtype. """
+    rng = np.random.default_rng(seed)
+    shape = (size, size) if channels == 1 else (size, size, channels)
+    if np.dtype(dtype).kind == 'f':
+        return rng.random(shape, dtype=np.float32).astype(dtype)
+    return rng.integers(0, np.iinfo(dtype).max, shape, dtype=dtype, endpoint=True)
 
-import vispy
-from vispy import scene
-from vispy.app import use_app
+def to_uint8(arr):
+    """ Scale uint16/float ([0, 1]) images to uint8 for displays that need it. """
+    if arr.dtype == np.uint8:
+        return arr
+    if arr.dtype == np.uint16:
+        return (arr >> 8).astype(np.uint8)
+    f = np.multiply(arr, 255, dtype=np.float32)
+    np.clip(f, 0, 255, out=f)
+    return f.astype(np.uint8)
 
-def pil_gui_test(arr):
-    # https://stackoverflow.com/questions/52459277/convert-a-c-or-numpy-array-to-a-tkinter-photoimage-with-a-minimum-number-of-copi
+def _tk_root():
+    import tkinter as tk
 
     root = tk.Tk()
-    
-    start = time.time()
-    img = ImageTk.PhotoImage(Image.fromarray(arr))
-    stop = time.time()
-    print(f"Pillow run took {stop-start} s")
-    
-    lbl = tk.Label(root, image=img)
-    lbl.pack()
-    root.mainloop()
-    
-def matplotlib_gui_test(arr):
+    root.title("tk_gui_benchmarks")
+    return root
+
+class Backend(abc.ABC):
+    """
+    One image display. first_draw shows the first image, update replaces it
+    with another image of the same shape in place; both return once the image
+    has been drawn. update is show (swap the data, request a redraw) followed
+    by sync (process GUI events until drawn), so event-loop driven callers
+    can call show alone. Backends import their GUI libraries on construction
+    only.
+    """
+    name = None
+
+    @abc.abstractmethod
+    def first_draw(self, arr):
+        pass
+
+    @abc.abstractmethod
+    def show(self, arr):
+        pass
+
+    def sync(self):
+        self.root.update()
+
+    def update(self, arr):
+        self.show(arr)
+        self.sync()
+
+    def close(self):
+        pass
+
+class PillowBackend(Backend):
+    # https://stackoverflow.com/questions/52459277/convert-a-c-or-numpy-array-to-a-tkinter-photoimage-with-a-minimum-number-of-copi
+    name = 'pil'
+
+    def __init__(self):
+        import tkinter as tk
+        from PIL import Image, ImageTk
+        self.Image, self.ImageTk = Image, ImageTk
+
+        self.root = _tk_root()
+        self.lbl = tk.Label(self.root)
+        self.lbl.pack()
+
+    def first_draw(self, arr):
+        self.img = self.ImageTk.PhotoImage(self.Image.fromarray(to_uint8(arr)))
+        self.lbl.configure(image=self.img)
+        self.sync()
+
+    def show(self, arr):
+        # paste into the existing PhotoImage instead of creating a new one
+        self.img.paste(self.Image.fromarray(to_uint8(arr)))
+
+    def close(self):
+        self.root.destroy()
+
+class MatplotlibBackend(Backend):
     # https://matplotlib.org/3.1.0/gallery/user_interfaces/embedding_in_tk_sgskip.html
+    name = 'matplotlib'
 
-    root = tk.Tk()
-    
-    f = Figure()
-    canvas = FigureCanvasTkAgg(f,root)
-    canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
-    
-    start = time.time()
- 
-    f.add_subplot(111).imshow(arr)
-    canvas.draw()
-    
-    stop = time.time()
-    print(f"Matplotlib run took {stop-start} s")
-    
-    lbl = tk.Label(root)
-    lbl.pack()
-    
-    root.mainloop()
-    
-def vispy_gui_test(arr):
+    def __init__(self):
+        import tkinter as tk
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        self.root = _tk_root()
+        self.fig = Figure()
+        self.canvas = FigureCanvasTkAgg(self.fig, self.root)
+        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+
+    @staticmethod
+    def _prepare(arr):
+        # imshow takes uint8 or [0, 1] float RGB, any dtype for one channel
+        if arr.ndim == 3 and arr.dtype != np.uint8 and arr.dtype.kind != 'f':
+            return arr/np.float32(np.iinfo(arr.dtype).max)
+        return arr
+
+    def first_draw(self, arr):
+        self.im = self.fig.add_subplot(111).imshow(self._prepare(arr))
+        self.canvas.draw()
+        self.sync()
+
+    def show(self, arr):
+        self.im.set_data(self._prepare(arr))
+        self.canvas.draw()
+
+    def close(self):
+        self.root.destroy()
+
+class AggBackend(MatplotlibBackend):
+    # matplotlib rendered offscreen, no display needed
+    name = 'agg'
+
+    def __init__(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        self.fig = Figure()
+        self.canvas = FigureCanvasAgg(self.fig)
+
+    def sync(self):
+        pass
+
+    def close(self):
+        pass
+
+class VispyBackend(Backend):
     # https://github.com/vispy/vispy/issues/2168
     # https://vispy.org/gallery/scene/image.html
-    
-    root = tk.Tk()
-    app = use_app("tkinter")
-    canvas = vispy.scene.SceneCanvas(keys='interactive', show=True, parent=root, app=app)
-    
-    # Set up a viewbox to display the image with interactive pan/zoom
-    view = canvas.central_widget.add_view()
-    
-    # Set 2D camera (the camera will scale to the contents in the scene)
-    view.camera = scene.PanZoomCamera(aspect=1)
-    view.camera.flip = (0, 1, 0)
-    view.camera.zoom(1.0)
-    
-    # TODO: This isn't setting the window size correctly.
-    # Need to manually expand the window to see the image
-    canvas.native.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
-    
-    # Create the image
-    start = time.time()
-    image = scene.visuals.Image(arr, interpolation='nearest',
-                                parent=view.scene, method='subdivide')
-    view.camera.set_range()
-    stop = time.time()
-    print(f"Vispy run took {stop-start} s")
-    
-    app.run()
-    
+    name = 'vispy'
+
+    def __init__(self):
+        import tkinter as tk
+        from vispy import scene
+        from vispy.app import use_app
+        self.scene = scene
+
+        self.root = _tk_root()
+        self.app = use_app("tkinter")
+        self.canvas = scene.SceneCanvas(keys='interactive', show=True, parent=self.root,
+                                        app=self.app, size=(800, 800))
+
+        # Set up a viewbox to display the image with interactive pan/zoom
+        self.view = self.canvas.central_widget.add_view()
+
+        # Set 2D camera (the camera will scale to the contents in the scene)
+        self.view.camera = scene.PanZoomCamera(aspect=1)
+        self.view.camera.flip = (0, 1, 0)
+        self.canvas.native.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+
+    @staticmethod
+    def _prepare(arr):
+        # textures are uint8 or float32
+        return arr if arr.dtype in (np.uint8, np.float32) else arr.astype(np.float32)
+
+    def first_draw(self, arr):
+        clim = (0, 1) if arr.dtype.kind == 'f' else (0, np.iinfo(arr.dtype).max)
+        self.image = self.scene.visuals.Image(self._prepare(arr), interpolation='nearest',
+                                              parent=self.view.scene, method='subdivide', clim=clim)
+        self.view.camera.set_range()
+        self.canvas.update()
+        self.sync()
+
+    def show(self, arr):
+        # uploads into the existing texture
+        self.image.set_data(self._prepare(arr))
+        self.canvas.update()
+
+    def sync(self):
+        self.app.process_events()
+        self.root.update()
+
+    def close(self):
+        self.canvas.close()
+        self.root.destroy()
+
+BACKENDS = {b.name: b for b in (PillowBackend, MatplotlibBackend, VispyBackend, AggBackend)}
+
+def _stats(times):
+    t = np.asarray(times)
+    return {'min': t.min(), 'median': float(np.median(t)), 'mean': t.mean(),
+            'std': t.std(ddof=1) if t.size > 1 else 0.0, 'p95': float(np.percentile(t, 95))}
+
+def benchmark_case(backend, size, dtype, channels, repeats=20, warmup=3):
+    """
+    Time one backend on one image shape/dtype.
+
+    Returns
+    -------
+    dict
+        first_draw time and min/median/mean/std/p95 of the update times, in s.
+    """
+    frames = [make_image(size, dtype, channels, seed=i) for i in range(2)]
+    display = BACKENDS[backend]()
+    try:
+        start = time.perf_counter()
+        display.first_draw(frames[0])
+        first = time.perf_counter() - start
+
+        for i in range(warmup):
+            display.update(frames[(i+1) % 2])
+
+        times = []
+        for i in range(repeats):
+            start = time.perf_counter()
+            display.update(frames[(i+1) % 2])
+            times.append(time.perf_counter() - start)
+    finally:
+        display.close()
+
+    result = {'first_draw': first}
+    result.update({f"update_{k}": float(v) for k, v in _stats(times).items()})
+    return result
+
+def run(backends, sizes=SIZES, dtypes=DTYPES, channels=CHANNELS, repeats=20, warmup=3, verbose=True):
+    """
+    Run every (backend, size, dtype, channels) case. Failing backends (e.g.
+    not installed, no display) are recorded with their error and skipped.
+    """
+    results = []
+    broken = {}
+    for backend in backends:
+        for size in sizes:
+            for dtype in dtypes:
+                for ch in channels:
+                    row = {'backend': backend, 'size': size, 'dtype': dtype, 'channels': ch,
+                           'repeats': repeats}
+                    if backend in broken:
+                        row['error'] = broken[backend]
+                        results.append(row)
+                        continue
+                    try:
+                        row.update(benchmark_case(backend, size, dtype, ch, repeats, warmup))
+                    except Exception as e:
+                        row['error'] = f"{type(e).__name__}: {e}"
+                        if isinstance(e, ImportError) or 'display' in str(e).lower():
+                            broken[backend] = row['error']
+                    results.append(row)
+                    if verbose:
+                        _report(row)
+    return results
+
+def _report(row):
+    case = f"{row['backend']:>10} {row['size']:>5}^2 {row['dtype']:>7} x{row['channels']}"
+    if 'error' in row:
+        print(f"{case}  skipped ({row['error']})")
+    else:
+        print(f"{case}  first {1e3*row['first_draw']:8.2f} ms  update {1e3*row['update_median']:8.2f}"
+              f" +/- {1e3*row['update_std']:.2f} ms (median +/- std, n={row['repeats']})")
+
+def environment():
+    """ Versions of the Python packages the benchmark depends on. """
+    env = {'python': sys.version.split()[0], 'platform': platform.platform(), 'numpy': np.__version__}
+    for mod in ('PIL', 'matplotlib', 'vispy'):
+        try:
+            env[mod] = __import__(mod).__version__
+        except ImportError:
+            env[mod] = None
+    try:
+        import tkinter
+        env['tk'] = tkinter.TkVersion
+    except ImportError:
+        env['tk'] = None
+    return env
+
+def write_json(results, filename):
+    with open(filename, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=1)
+
+def write_csv(results, filename):
+    fields = []
+    for row in results:
+        fields.extend(k for k in row if k not in fields)
+    with open(filename, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(results)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-b', '--backends', nargs='+', default=['pil', 'matplotlib', 'vispy'],
+                        choices=list(BACKENDS))
+    parser.add_argument('-s', '--sizes', nargs='+', type=int, default=list(SIZES))
+    parser.add_argument('-d', '--dtypes', nargs='+', default=list(DTYPES), choices=DTYPES)
+    parser.add_argument('-c', '--channels', nargs='+', type=int, default=list(CHANNELS), choices=(1, 3, 4))
+    parser.add_argument('-n', '--repeats', type=int, default=20, help="Timed updates per case")
+    parser.add_argument('-w', '--warmup', type=int, default=3, help="Untimed updates per case")
+    parser.add_argument('--json', help="Write results to this JSON file")
+    parser.add_argument('--csv', help="Write results to this CSV file")
+    args = parser.parse_args(argv)
+
+    results = run(args.backends, args.sizes, args.dtypes, args.channels, args.repeats, args.warmup)
+    if args.json:
+        write_json(results, args.json)
+    if args.csv:
+        write_csv(results, args.csv)
+    return 0
+
 if __name__ == "__main__":
-    # generate image array to plot
-    arr = np.random.randint(low=255, size=(100, 100, 3), dtype=np.uint8) 
-    
-    pil_gui_test(arr)
-    
-    matplotlib_gui_test(arr)
-    
-    vispy_gui_test(arr)
+    sys.exit(main())
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Live display of a camera-like frame stream in tkinter
+
+A producer thread writes frames into a ring of preallocated buffers. The
+display runs on a Tk after() tick, always shows the newest complete frame
+by updating the existing PhotoImage / imshow artist / vispy texture in place
+(see tk_gui_benchmarks), and skips the frames it had no time for. Achieved
+display rate, dropped frames and frame-to-display latency are reported.
+
+Usage:
+    python tk_stream_viewer.py [-b pil] [-s 1024] [-d uint8] [-c 1] [--fps 200] [-t 10]
+"""
+
+import sys
+import time
+import argparse
+import threading
+
+import numpy as np
+
+from tk_gui_benchmarks import BACKENDS, make_image
+
+class FrameRing:
+    """
+    Fixed ring of preallocated frames shared by one producer and one reader.
+
+    The producer writes into the slot returned by acquire() and publishes it
+    with commit(). The reader takes the newest committed frame with latest()
+    and hands it back with release(). The producer never writes into the
+    slot being read nor into the newest frame, so n_slots >= 3.
+    """
+    def __init__(self, shape, dtype=np.uint8, n_slots=4):
+        if n_slots < 3:
+            raise ValueError("FrameRing needs at least 3 slots")
+        self.frames = np.zeros((n_slots,) + tuple(shape), dtype=dtype)
+        self.seq = np.zeros(n_slots, dtype=np.int64)
+        self.stamps = np.zeros(n_slots)
+        self.count = 0  # frames committed so far
+        self._next = 0
+        self._latest = -1
+        self._reading = -1
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """ Index of the slot the producer writes the next frame into. """
+        with self._lock:
+            i = self._next
+            while i in (self._latest, self._reading):
+                i = (i+1) % len(self.frames)
+            self._next = (i+1) % len(self.frames)
+            return i
+
+    def commit(self, i, stamp=None):
+        """ Publish slot i, stamped with its acquisition time (perf_counter). """
+        with self._lock:
+            self.count += 1
+            self.seq[i] = self.count
+            self.stamps[i] = time.perf_counter() if stamp is None else stamp
+            self._latest = i
+
+    def latest(self, after=0):
+        """
+        (frame, seq, stamp) of the newest frame if its sequence number is
+        above after, else None. The frame stays valid until release().
+        """
+        with self._lock:
+            i = self._latest
+            if i < 0 or self.seq[i] <= after:
+                return None
+            self._reading = i
+            return self.frames[i], int(self.seq[i]), float(self.stamps[i])
+
+    def release(self):
+        with self._lock:
+            self._reading = -1
+
+class SyntheticCamera:
+    """
+    Camera stand-in, fills frames in place with a scrolling random pattern.
+    """
+    def __init__(self, shape, dtype=np.uint8, seed=0):
+        size, channels = shape[0], (shape[2] if len(shape) == 3 else 1)
+        self.pattern = make_image(size, dtype, channels, seed)[:, :shape[1]]
+        self.k = 0
+
+    def __call__(self, out):
+        w = out.shape[1]
+        k = self.k = (self.k + 7) % w
+        out[:, :w-k] = self.pattern[:, k:]
+        out[:, w-k:] = self.pattern[:, :k]
+
+class Producer(threading.Thread):
+    """ Thread filling ring frames with camera(out) at up to fps frames per second. """
+    def __init__(self, ring, camera, fps=None):
+        super().__init__(daemon=True)
+        self.ring, self.camera, self.fps = ring, camera, fps
+        self._stop_event = threading.Event()
+
+    def run(self):
+        period = 1/self.fps if self.fps else 0
+        next_t = time.perf_counter()
+        while not self._stop_event.is_set():
+            i = self.ring.acquire()
+            self.camera(self.ring.frames[i])
+            self.ring.commit(i)
+            if period:
+                next_t += period
+                delay = next_t - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_t = time.perf_counter()  # fell behind, don't try to catch up
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+class StreamViewer:
+    """
+    Show the newest frame of a FrameRing every interval ms with one of the
+    tk_gui_benchmarks backends, dropping frames the display cannot keep up
+    with.
+    """
+    def __init__(self, ring, backend='pil', interval=1):
+        self.ring = ring
+        self.display = BACKENDS[backend]()
+        self.interval = interval
+        self.last_seq = 0
+        self.shown = 0
+        self.latencies = []
+        self._start = None
+        self._elapsed = None
+        self._produced = None
+
+    def tick(self):
+        """ Display the newest frame, if there is one we have not shown yet. """
+        got = self.ring.latest(self.last_seq)
+        if got is None:
+            return False
+        frame, seq, stamp = got
+        try:
+            if self.shown == 0:
+                self.display.first_draw(frame)
+            else:
+                self.display.show(frame)
+        finally:
+            self.ring.release()
+        self.latencies.append(time.perf_counter() - stamp)
+        self.last_seq = seq
+        self.shown += 1
+        return True
+
+    def run(self, duration=10):
+        """ Run for duration s (forever if None) and return stats(). """
+        self._start = time.perf_counter()
+        root = getattr(self.display, 'root', None)
+        if root is None:
+            # offscreen backends: no event loop, just poll
+            while duration is None or time.perf_counter() - self._start < duration:
+                if not self.tick():
+                    time.sleep(self.interval/1000)
+        else:
+            def loop():
+                self.tick()
+                root.after(self.interval, loop)
+            root.after(0, loop)
+            if duration is not None:
+                root.after(int(1000*duration), root.quit)
+            root.mainloop()
+        # snapshot the producer's count together with the run time
+        self._elapsed = time.perf_counter() - self._start
+        self._produced = self.ring.count
+        return self.stats()
+
+    def stats(self):
+        """
+        Produced/displayed rates, dropped frames and latency percentiles (ms).
+
+        Dropped are the frames skipped up to the last one shown; frames
+        committed after it are counted as produced only.
+        """
+        if self._elapsed is None:
+            elapsed, produced = time.perf_counter() - self._start, self.ring.count
+        else:
+            elapsed, produced = self._elapsed, self._produced
+        lat = 1e3*np.asarray(self.latencies) if self.latencies else np.zeros(1)
+        return {'elapsed': elapsed, 'produced': produced, 'shown': self.shown,
+                'dropped': self.last_seq - self.shown, 'camera_fps': produced/elapsed,
+                'display_fps': self.shown/elapsed, 'latency_median_ms': float(np.median(lat)),
+                'latency_p95_ms': float(np.percentile(lat, 95)), 'latency_max_ms': float(lat.max())}
+
+    def close(self):
+        self.display.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-b', '--backend', default='pil', choices=list(BACKENDS))
+    parser.add_argument('-s', '--size', type=int, default=1024)
+    parser.add_argument('-d', '--dtype', default='uint8', choices=('uint8', 'uint16', 'float32'))
+    parser.add_argument('-c', '--channels', type=int, default=1, choices=(1, 3))
+    parser.add_argument('--fps', type=float, default=200, help="Camera frame rate, 0 for as fast as possible")
+    parser.add_argument('--slots', type=int, default=4, help="Ring buffer size")
+    parser.add_argument('-i', '--interval', type=int, default=1, help="Display tick (ms)")
+    parser.add_argument('-t', '--duration', type=float, default=10, help="Run time (s)")
+    args = parser.parse_args(argv)
+
+    shape = (args.size, args.size) + ((args.channels,) if args.channels > 1 else ())
+    ring = FrameRing(shape, args.dtype, args.slots)
+    producer = Producer(ring, SyntheticCamera(shape, args.dtype), args.fps)
+    viewer = StreamViewer(ring, args.backend, args.interval)
+
+    producer.start()
+    try:
+        stats = viewer.run(args.duration)
+    finally:
+        producer.stop()
+        viewer.close()
+
+    print(f"{args.backend}: camera {stats['camera_fps']:.1f} fps, display {stats['display_fps']:.1f} fps, "
+          f"{stats['dropped']} of {stats['produced']} frames dropped, latency "
+          f"{stats['latency_median_ms']:.1f} ms median / {stats['latency_p95_ms']:.1f} ms p95")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import numpy as np
+
+import fft_backend as fb
+
+def pupil_coordinates(wvl, n, pixel_size, chip_size):
+    """
+    Normalized spatial frequency grids (X, Y) of the pupil plane, in
+    np.fft.fftfreq order.
+    """
+    # Create frequency space
+    # f = np.arange(-chip_size//2,chip_size//2)/(pixel_size*chip_size) # <cycles per chip>*<cycle size [nm^-1]>
+    # If f above is used, we need an additional ifftshift
+    f = np.fft.fftfreq(chip_size, pixel_size)*wvl/n
+    X, Y = np.meshgrid(f,f)
+
+    return X, Y
+
+def _roi_indices(roi, chip_size):
+    """ Convert a (y, x) pair of slices/index arrays into index arrays. """
+    idx = np.arange(chip_size)
+    return idx[roi[0]], idx[roi[1]]
+
+def _dft_matrix(out_idx, in_idx, chip_size, dtype=complex):
+    """
+    Rows of fftshift(ifft(ifftshift(.))) restricted to the output pixels
+    out_idx and the (nonzero) pupil samples in_idx.
+    """
+    c = chip_size//2
+    K = np.exp(2j*np.pi*np.outer(out_idx-c, in_idx-c)/chip_size)/chip_size
+    return K.astype(dtype, copy=False)
+
+def _matrix_dft(pupil, rows, cols, roi, chip_size):
+    """ PSF at the roi pixels from the rows x cols sub-grid of a pupil. """
+    iy, ix = _roi_indices(roi, chip_size)
+    Ky = _dft_matrix(iy, rows, chip_size, pupil.dtype)
+    Kx = _dft_matrix(ix, cols, chip_size, pupil.dtype)
+
+    return Ky @ pupil @ Kx.T
+
+def psf_from_pupil(pupil, roi=None):
+    """
+    Electric field of the PSF from a (stack of) pupil functions.
+
+    Parameters
+    ----------
+    pupil : np.array
+        (..., chip_size, chip_size) complex pupil in np.fft.fftfreq order.
+    roi : tuple
+        Optional (y, x) pair of slices or index arrays selecting the output
+        pixels. See widefield_psf_3d.
+
+    Returns
+    -------
+    psf : np.array
+        (..., chip_size, chip_size) or (..., len(y), len(x)) complex array
+        of the same precision as pupil.
+    """
+    if roi is not None:
+        # Only rows/columns that intersect the nonzero pupil contribute
+        support = np.any(pupil != 0, axis=tuple(range(pupil.ndim-2)))
+        rows = np.flatnonzero(support.any(axis=1))
+        cols = np.flatnonzero(support.any(axis=0))
+        return _matrix_dft(pupil[..., rows[:,None], cols[None,:]], rows, cols, roi, pupil.shape[-1])
+
+    # Take the inverse fourier transform of the pupil
+    # to get the point spread function
+    axes = (-2,-1)
+    psf = fb.fftshift(fb.ifft2(fb.ifftshift(pupil, axes=axes), axes=axes), axes=axes)
+
+    # Some backends promote complex64 to complex128
+    return psf.astype(pupil.dtype, copy=False)
+
+def widefield_psf_2d(wvl, NA, n, pixel_size, chip_size, z=0.0, roi=None, dtype=np.complex128):
+    """
+    Construct the electric field for a widefield PSF in 2d.
+
+    Parameters
+    ----------
+    wvl : float
+        Wavelength of emitted light in nm.
+    NA : float
+        Numerical aperture of the optical system
+    n : float
+        Refractive index surrounding point source
+    pixel_size : float
+        Effective pixel size of camera chip in nm
+    chip_size : int
+        How many pixels on the camera chip?
+    z : float
+        Depth from focus
+    roi : tuple
+        Optional (y, x) pair of slices or index arrays selecting the output
+        pixels to compute. See widefield_psf_3d.
+    dtype : np.dtype
+        Precision of the result, np.complex128 or np.complex64.
+
+    Returns
+    -------
+    psf : np.array
+        Array of np.complex values describing electric field of the PSF.
+    """
+    return widefield_psf_3d(wvl, NA, n, pixel_size, chip_size, [z], roi=roi, dtype=dtype)[0]
+
+def widefield_psf_3d(wvl, NA, n, pixel_size, chip_size, z_array, roi=None, dtype=np.complex128):
+    """
+    Construct the electric field for a widefield PSF at a series of depths.
+
+    The pupil grid and aperture are built once and the defocus phase is
+    broadcast over all depths, so the whole stack is a single batched ifft2.
+
+    Parameters
+    ----------
+    wvl : float
+        Wavelength of emitted light in nm.
+    NA : float
+        Numerical aperture of the optical system
+    n : float
+        Refractive index surrounding point source
+    pixel_size : float
+        Effective pixel size of camera chip in nm
+    chip_size : int
+        How many pixels on the camera chip?
+    z_array : array-like
+        Depths from focus, one per output plane
+    roi : tuple
+        Optional (y, x) pair of slices or index arrays into the full
+        chip_size x chip_size output. Only those pixels are evaluated, by a
+        matrix DFT over the nonzero part of the pupil instead of a full-size
+        ifft2, which is much cheaper for small crops.
+    dtype : np.dtype
+        Precision of the result. np.complex64 keeps the phase, exp and FFT
+        in single precision, halving memory.
+
+    Returns
+    -------
+    psf : np.array
+        (len(z_array), chip_size, chip_size) array of np.complex values
+        describing electric field of the PSF at each depth, or
+        (len(z_array), len(y), len(x)) if roi is given.
+    """
+    rdtype = np.finfo(dtype).dtype
+    z = np.asarray(z_array, dtype=rdtype).ravel()
+    X, Y = pupil_coordinates(wvl, n, pixel_size, chip_size)
+    r2 = X*X+Y*Y
+
+    # Create an aperture in frequency space
+    # Clip on 1/<spatial resolution of the system> (spatial frequency)
+    # Note the "missing" factor of 2 since we are thresholding on radius
+    # rescale by refractive index
+    aperture = r2 <= (NA/n)**2
+
+    if roi is not None:
+        # Only rows/columns that intersect the aperture contribute
+        rows = np.flatnonzero(aperture.any(axis=1))
+        cols = np.flatnonzero(aperture.any(axis=0))
+        r2 = r2[np.ix_(rows, cols)]
+        aperture = aperture[np.ix_(rows, cols)]
+
+    # The pupil can also contain aberrations, but they must
+    # be clipped by aperture (see zernike.aberrated_pupil)
+    k = 2.0*np.pi/(n*wvl)
+    kz = (k*np.sqrt(1-np.minimum(r2,1))).astype(rdtype)
+    pupil = np.exp(1j*(z[:,None,None]*kz[None,...]))
+    pupil *= aperture[None,...]
+
+    if roi is not None:
+        return _matrix_dft(pupil, rows, cols, roi, chip_size)
+
+    return psf_from_pupil(pupil)
+
+def amplitude_psf(psf):
+    """ Return the amplitude of a PSF, described by its electric field. """
+    return np.abs(psf)
+
+def intensity_psf(psf):
+    """ Return the intensity of a PSF, described by its electric field. """
+    return np.abs(psf*np.conj(psf))
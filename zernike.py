@@ -0,0 +1,127 @@
+"""
+Zernike-aberrated widefield pupils and PSFs.
+
+The Zernike basis is evaluated once per pupil geometry and cached, so an
+aberrated pupil is a single (n_batch, n_terms) x (n_terms, n_pupil) product.
+"""
+
+from functools import lru_cache
+from math import factorial
+
+import numpy as np
+
+from widefield_psf import pupil_coordinates, psf_from_pupil
+
+def noll_to_nm(j):
+    """ Convert a (1-based) Noll index j to the Zernike radial/azimuthal orders (n, m). """
+    n, j1 = 0, j-1
+    while j1 > n:
+        n += 1
+        j1 -= n
+    # Noll puts even j on cosine (m > 0) and odd j on sine (m < 0) terms
+    m = (-1)**j*((n % 2) + 2*((j1 + (n+1) % 2)//2))
+    return n, m
+
+def zernike_nm(n, m, rho, theta):
+    """
+    Noll-normalized Zernike polynomial Z_n^m on the unit disk.
+
+    Parameters
+    ----------
+    n, m : int
+        Radial and azimuthal order (|m| <= n, n-|m| even). m < 0 selects
+        the sine term.
+    rho, theta : np.array
+        Normalized radius and angle.
+    """
+    am = abs(m)
+    R = np.zeros_like(rho)
+    for s in range((n-am)//2+1):
+        c = (-1)**s*factorial(n-s)/(factorial(s)*factorial((n+am)//2-s)*factorial((n-am)//2-s))
+        R += c*rho**(n-2*s)
+
+    if m == 0:
+        return np.sqrt(n+1)*R
+    ang = np.cos(am*theta) if m > 0 else np.sin(am*theta)
+    return np.sqrt(2*(n+1))*R*ang
+
+@lru_cache(maxsize=16)
+def _pupil_geometry(wvl, NA, n, pixel_size, chip_size):
+    X, Y = pupil_coordinates(wvl, n, pixel_size, chip_size)
+    r2 = X*X+Y*Y
+    aperture = r2 <= (NA/n)**2
+
+    rho = np.sqrt(r2[aperture])/(NA/n)
+    theta = np.arctan2(Y[aperture], X[aperture])
+    k = 2.0*np.pi/(n*wvl)
+    kz = k*np.sqrt(1-np.minimum(r2[aperture],1))
+
+    for a in (aperture, rho, theta, kz):
+        a.flags.writeable = False
+    return aperture, rho, theta, kz
+
+@lru_cache(maxsize=16)
+def zernike_basis(n_terms, wvl, NA, n, pixel_size, chip_size):
+    """
+    Zernike polynomials 1..n_terms (Noll order) sampled inside the aperture.
+
+    Results are cached per pupil geometry.
+
+    Returns
+    -------
+    aperture : np.array
+        (chip_size, chip_size) boolean aperture in np.fft.fftfreq order.
+    basis : np.array
+        (n_terms, aperture.sum()) read-only array, one polynomial per row.
+    """
+    aperture, rho, theta, _ = _pupil_geometry(wvl, NA, n, pixel_size, chip_size)
+    basis = np.empty((n_terms, rho.size))
+    for j in range(1, n_terms+1):
+        basis[j-1] = zernike_nm(*noll_to_nm(j), rho, theta)
+    basis.flags.writeable = False
+
+    return aperture, basis
+
+def aberrated_pupil(coeffs, wvl, NA, n, pixel_size, chip_size, z=0.0, dtype=np.complex128):
+    """
+    Pupil function with Zernike aberrations and defocus.
+
+    Parameters
+    ----------
+    coeffs : array-like
+        (n_terms,) or (n_batch, n_terms) Zernike coefficients in radians of
+        phase, Noll ordered starting from piston (j=1).
+    wvl, NA, n, pixel_size, chip_size, z
+        See widefield_psf.widefield_psf_2d.
+    dtype : np.dtype
+        Precision of the pupil, np.complex128 or np.complex64.
+
+    Returns
+    -------
+    pupil : np.array
+        (n_batch, chip_size, chip_size) complex pupils, or (chip_size,
+        chip_size) for a single coefficient vector.
+    """
+    rdtype = np.finfo(dtype).dtype
+    coeffs = np.asarray(coeffs, dtype=rdtype)
+    single = coeffs.ndim == 1
+    coeffs = np.atleast_2d(coeffs)
+
+    aperture, basis = zernike_basis(coeffs.shape[1], wvl, NA, n, pixel_size, chip_size)
+    kz = _pupil_geometry(wvl, NA, n, pixel_size, chip_size)[3]
+
+    phase = coeffs @ basis.astype(rdtype, copy=False)
+    phase += (z*kz).astype(rdtype)
+    pupil = np.zeros((coeffs.shape[0], chip_size, chip_size), dtype=dtype)
+    pupil[:, aperture] = np.exp(1j*phase)
+
+    return pupil[0] if single else pupil
+
+def aberrated_psf(coeffs, wvl, NA, n, pixel_size, chip_size, z=0.0, roi=None, dtype=np.complex128):
+    """
+    Electric field of Zernike-aberrated widefield PSFs, batched over
+    coefficient vectors. See aberrated_pupil for the arguments and
+    widefield_psf.widefield_psf_3d for roi.
+    """
+    pupil = aberrated_pupil(coeffs, wvl, NA, n, pixel_size, chip_size, z=z, dtype=dtype)
+    return psf_from_pupil(pupil, roi=roi)